@@ -1,8 +1,9 @@
 import os
-from flask import Flask, jsonify, session, send_file
+import time
+_import_started = time.perf_counter()
+from flask import Flask, jsonify, session
 from flask_sqlalchemy import SQLAlchemy
 from flask_session import Session
-from flask_migrate import Migrate
 from flask_cors import CORS
 from dotenv import load_dotenv
 from datetime import timedelta, datetime
@@ -12,9 +13,32 @@ import traceback
 load_dotenv(override=True)
 
 db = SQLAlchemy()
-migrate = Migrate()
+# used when SESSION_SECRET is unset; public, so nothing may be signed with it
+DEFAULT_SESSION_SECRET = 'event-pyramide-secret-key-change-in-production'
+IMPORT_MS = (time.perf_counter() - _import_started) * 1000
+
+def _check_schema():
+    """Create tables at boot only when the tracked migrations say the schema is behind"""
+    mode = os.getenv('SCHEMA_CHECK', 'migrations').lower()
+    if mode == 'off':
+        return 'skipped'
+    if mode != 'create_all':
+        from app.services import schema_migrations
+        if schema_migrations.is_current():
+            return 'current'
+    db.create_all()
+    return 'created'
 
 def create_app():
+    timings = {'imports_ms': IMPORT_MS}
+    started = phase = time.perf_counter()
+    
+    def mark(name):
+        nonlocal phase
+        now = time.perf_counter()
+        timings[name] = (now - phase) * 1000
+        phase = now
+    
     app = Flask(__name__)
     app.url_map.strict_slashes = False
     cors_origins = os.getenv(
@@ -29,27 +53,32 @@ def create_app():
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
          expose_headers=["Content-Type"])
     
-    db_user = os.getenv('DB_USER', 'eventuser')
-    db_password = os.getenv('DB_PASSWORD', 'eventpass')
-    db_host = os.getenv('DB_HOST', 'localhost')
-    db_port = os.getenv('DB_PORT', '5432')
-    db_name = os.getenv('DB_NAME', 'eventpyramide')
-    
-    app.config['SQLALCHEMY_DATABASE_URI'] = (
-        f"postgresql+pg8000://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    )
+    from app.services import database
+    app.config['SQLALCHEMY_DATABASE_URI'] = database.database_uri()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SESSION_TYPE'] = 'filesystem'
+    app.config['SESSION_FILE_DIR'] = os.getenv('SESSION_FILE_DIR', os.path.join(os.getcwd(), 'flask_session'))
     app.config['SESSION_PERMANENT'] = True
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
     app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
     app.config['SESSION_COOKIE_SECURE'] = os.getenv('SESSION_COOKIE_SECURE', 'false').lower() == 'true'
     app.config['SESSION_COOKIE_HTTPONLY'] = True
-    app.secret_key = os.getenv('SESSION_SECRET', 'event-pyramide-secret-key-change-in-production')
+    app.config['LANGUAGE_FILE_MAX_AGE'] = int(os.getenv('LANGUAGE_FILE_MAX_AGE', 600))
+    app.secret_key = os.getenv('SESSION_SECRET', DEFAULT_SESSION_SECRET)
     
     db.init_app(app)
-    migrate.init_app(app, db)
+    with app.app_context():
+        database.configure_engine(db.engine)
+    from app.services import metrics, query_audit
+    metrics.init_app(app, db)
+    query_audit.init_app(app, db)
     Session(app)
+    if os.getenv('FLASK_MIGRATE', 'false').lower() == 'true':
+        # alembic alone costs more than the rest of startup; only load it for `flask db`
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    mark('config_ms')
     
     from app.models import User, Invitation, EventConfig, BotMessage, Ticket, SecurityIncident
     from app.routes import auth_bp, invitations_bp, admin_bp, bot_bp
@@ -57,6 +86,7 @@ def create_app():
     from app.routes.tickets import tickets_bp
     from app.routes.security import security_bp
     from app.routes.bar import bar_bp, admin_bar_bp
+    from app.routes.events import events_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(invitations_bp)
@@ -67,6 +97,8 @@ def create_app():
     app.register_blueprint(security_bp)
     app.register_blueprint(bar_bp)
     app.register_blueprint(admin_bar_bp)
+    app.register_blueprint(events_bp)
+    mark('blueprints_ms')
     
     @app.route('/')
     def index():
@@ -90,27 +122,48 @@ def create_app():
         lang = session.get('language', get_current_language())
         return jsonify({'language': lang, 'available': AVAILABLE_LANGUAGES})
 
-    # serve language files from the languages folder so the frontend can fetch them directly
+    # serve language files from the languages folder so the frontend can fetch them directly;
+    # they are held in memory (re-read on every request in debug mode)
     @app.route('/languages/<lang_code>.json')
     def serve_language_file(lang_code):
-        from languages import LANGUAGES_DIR
-        lang_file = LANGUAGES_DIR / f"{lang_code}.json"
-        if lang_file.exists():
-            return send_file(lang_file, mimetype='application/json')
-        return jsonify({'error': 'not found'}), 404
+        from languages import language_files
+        from app.services import http_cache
+        found = language_files(reload=app.debug).get(lang_code)
+        if not found:
+            return jsonify({'error': 'not found'}), 404
+        raw, etag = found
+        return http_cache.conditional(
+            f'lang-{lang_code}-{etag}',
+            f"public, max-age={app.config['LANGUAGE_FILE_MAX_AGE']}",
+            lambda: app.response_class(raw, mimetype='application/json')
+        )
+    
+    from app.middleware.auth import require_admin_or_metrics_token
     
     @app.route('/api/admin/diagnostics', methods=['GET'])
+    @require_admin_or_metrics_token
     def diagnostics():
         from app.services.cache import get_cache_status
+        from app.services import database, metrics, query_audit
         try:
             cache_status = get_cache_status()
             return jsonify({
                 'cache': cache_status,
+                'database': database.status(db.engine),
+                'requests': metrics.summary(),
+                'n_plus_one': query_audit.recent_findings(),
+                'startup': app.config['STARTUP_TIMINGS'],
                 'timestamp': datetime.utcnow().isoformat()
             })
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    from app.services.pagination import PaginationError
+    
+    @app.errorhandler(PaginationError)
+    def handle_pagination_error(error):
+        return jsonify({'error': str(error)}), 400
+    
     @app.errorhandler(500)
     def handle_500_error(error):
         import sys
@@ -120,7 +173,21 @@ def create_app():
         print(error_msg, file=sys.stderr)
         return jsonify({'error': 'Internal server error', 'message': str(error)}), 500
     
+    mark('routes_ms')
+    
     with app.app_context():
-        db.create_all()
+        schema = _check_schema()
+        mark('db_connect_ms')
+        if os.getenv('TICKET_INDEX_PRELOAD', 'false').lower() == 'true':
+            from app.services import ticket_index
+            ticket_index.warm()
+            mark('ticket_index_ms')
     
+    timings['create_app_ms'] = (time.perf_counter() - started) * 1000
+    app.config['STARTUP_TIMINGS'] = {
+        'schema': schema,
+        'pid': os.getpid(),
+        **{name: round(ms, 1) for name, ms in timings.items()},
+    }
+    app.logger.info('startup %s', app.config['STARTUP_TIMINGS'])
     return app
\ No newline at end of file
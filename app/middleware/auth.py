@@ -1,15 +1,54 @@
-from functools import wraps
-from flask import session, jsonify, request
+import hmac
+from functools import wraps, lru_cache
+from collections import namedtuple
+from flask import session, jsonify, request, g
+from app import db
 from app.models import User
+from app.services import cache
 import os
 
+# Compact record of the signed-in user. It is memoised per request on `g` and
+# across requests in the cache, so the auth decorators don't hit the users
+# table on every call. Anything that changes these fields must call
+# invalidate_principal.
+Principal = namedtuple('Principal', ['id', 'username', 'role', 'is_admin', 'is_banned', 'attending'])
+
+def _principal_key(user_id):
+    return f'auth:principal:{user_id}'
+
+def load_principal(user_id):
+    principal = g.get('principal')
+    if principal and principal.id == user_id:
+        return principal
+
+    cached = cache.get(_principal_key(user_id))
+    if cached:
+        principal = Principal(**cached)
+    else:
+        row = db.session.query(
+            User.id, User.username, User.role, User.is_admin, User.is_banned, User.attending
+        ).filter(User.id == user_id).first()
+        if not row:
+            return None
+        principal = Principal(*row)
+        cache.set(_principal_key(user_id), principal._asdict(), ttl=cache.USER_CACHE_TTL)
+
+    g.principal = principal
+    return principal
+
+def invalidate_principal(user_id):
+    cache.delete(_principal_key(user_id))
+    principal = g.get('principal')
+    if principal and principal.id == user_id:
+        g.pop('principal')
+
 def require_auth(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return jsonify({'error': 'Unauthorized'}), 401
         
-        user = User.query.get(session['user_id'])
+        user = load_principal(session['user_id'])
         if not user:
             return jsonify({'error': 'Unauthorized'}), 401
         
@@ -17,10 +56,12 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def _is_env_admin(username):
-    admin_usernames = os.getenv('ADMIN_INSTAGRAM_USERNAMES', '').split(',')
-    admin_usernames = [u.strip().lower() for u in admin_usernames if u.strip()]
-    return username.lower() in admin_usernames
+@lru_cache(maxsize=4)
+def _env_admins(raw):
+    return frozenset(u.strip().lower() for u in raw.split(',') if u.strip())
+
+def is_env_admin(username):
+    return username.lower() in _env_admins(os.getenv('ADMIN_INSTAGRAM_USERNAMES', ''))
 
 def require_admin(f):
     @wraps(f)
@@ -28,7 +69,7 @@ def require_admin(f):
         if 'user_id' not in session:
             return jsonify({'error': 'Unauthorized'}), 401
         
-        user = User.query.get(session['user_id'])
+        user = load_principal(session['user_id'])
         # allow access if the user has the admin flag in the database *or* is
         # still listed in the environment variable.  previously we only checked
         # the env var which meant that anyone promoted through the UI (or later
@@ -36,13 +77,25 @@ def require_admin(f):
         # column was correct. this change makes a later‑added admin work as
         # expected while keeping the env list as a convenient bootstrap
         # mechanism.
-        if not user or not (user.is_admin or _is_env_admin(user.username)):
+        if not user or not (user.is_admin or is_env_admin(user.username)):
             return jsonify({'error': 'Forbidden: Admin access required'}), 403
         
         request.user = user
         return f(*args, **kwargs)
     return decorated_function
 
+def require_admin_or_metrics_token(f):
+    """Admin session, or `Authorization: Bearer $METRICS_TOKEN` for scrapers"""
+    admin_only = require_admin(f)
+    
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = os.getenv('METRICS_TOKEN')
+        if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return f(*args, **kwargs)
+        return admin_only(*args, **kwargs)
+    return decorated_function
+
 def require_role(roles):
     def decorator(f):
         @wraps(f)
@@ -50,7 +103,7 @@ def require_role(roles):
             if 'user_id' not in session:
                 return jsonify({'error': 'Unauthorized'}), 401
             
-            user = User.query.get(session['user_id'])
+            user = load_principal(session['user_id'])
             if not user:
                 return jsonify({'error': 'Unauthorized'}), 401
             
@@ -4,18 +4,23 @@ from decimal import Decimal
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     instagram_id = db.Column(db.String(255), unique=True, nullable=False)
-    username = db.Column(db.String(255), nullable=False)
+    username = db.Column(db.String(255), nullable=False, index=True)
     full_name = db.Column(db.String(255))
     profile_picture = db.Column(db.Text)
-    role = db.Column(db.String(50), default='user')
+    role = db.Column(db.String(50), default='user', index=True)
     is_admin = db.Column(db.Boolean, default=False)
     is_banned = db.Column(db.Boolean, default=False)
+    # signed tickets issued before this are revoked (ticket_signing)
+    banned_at = db.Column(db.DateTime)
     attending = db.Column(db.Boolean, nullable=True)
     invited_by = db.Column(db.Integer, db.ForeignKey('users.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     invitations = db.relationship('Invitation', foreign_keys='Invitation.inviter_id', backref='inviter')
@@ -38,13 +43,17 @@ class User(db.Model):
 
 class Invitation(db.Model):
     __tablename__ = 'invitations'
+    __table_args__ = (
+        db.Index('ix_invitations_inviter_id_status', 'inviter_id', 'status'),
+        db.Index('ix_invitations_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     inviter_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     invitee_instagram_id = db.Column(db.String(255), unique=True, nullable=False)
-    invitee_username = db.Column(db.String(255), nullable=False)
+    invitee_username = db.Column(db.String(255), nullable=False, index=True)
     status = db.Column(db.String(50), default='pending')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     accepted_at = db.Column(db.DateTime)
     
     def to_dict(self):
@@ -138,6 +147,14 @@ class RoleSalary(db.Model):
 
 class BotMessage(db.Model):
     __tablename__ = 'bot_messages'
+    __table_args__ = (
+        # broadcast.resume_abandoned looks for jobs with unsent recipients
+        db.Index(
+            'ix_bot_messages_unsent_job_id', 'job_id',
+            postgresql_where=db.text("status IN ('pending', 'sending')"),
+            sqlite_where=db.text("status IN ('pending', 'sending')")
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     message_type = db.Column(db.String(50), nullable=False)
@@ -145,6 +162,8 @@ class BotMessage(db.Model):
     sent_to_user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     sent_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(50), default='pending')
+    job_id = db.Column(db.String(64), index=True)
+    attempts = db.Column(db.Integer, default=0)
     
     def to_dict(self):
         return {
@@ -154,19 +173,28 @@ class BotMessage(db.Model):
             'sent_to_user_id': self.sent_to_user_id,
             'sent_at': self.sent_at.isoformat() if self.sent_at else None,
             'status': self.status,
+            'job_id': self.job_id,
+            'attempts': self.attempts,
         }
 
 class Ticket(db.Model):
     __tablename__ = 'tickets'
+    __table_args__ = (
+        db.Index('ix_tickets_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True, index=True)
     qr_code = db.Column(db.String(255), unique=True, nullable=False)
     verified = db.Column(db.Boolean, default=False)
     verified_at = db.Column(db.DateTime)
-    verified_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    verified_by = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    # set by offline scan uploads, which may only replace each other (ticket_sync.record_scans)
+    verified_offline = db.Column(db.Boolean, default=False)
     status = db.Column(db.String(50), default='active')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # stamped by ticket_sync on every change a door scanner cares about
+    change_seq = db.Column(db.BigInteger, db.Sequence('ticket_change_seq'), index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = db.relationship('User', foreign_keys=[user_id], backref='tickets')
@@ -224,12 +252,15 @@ security_incident_assignments = db.Table(
 )
 class ManagerCall(db.Model):
     __tablename__ = 'manager_calls'
+    __table_args__ = (
+        db.Index('ix_manager_calls_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     reason = db.Column(db.Text)
     status = db.Column(db.String(50), default='open')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     resolved_at = db.Column(db.DateTime)
     
     user = db.relationship('User', foreign_keys=[user_id], backref='manager_calls')
@@ -247,6 +278,9 @@ class ManagerCall(db.Model):
 
 class SecurityJob(db.Model):
     __tablename__ = 'security_jobs'
+    __table_args__ = (
+        db.Index('ix_security_jobs_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -254,7 +288,7 @@ class SecurityJob(db.Model):
     required_people = db.Column(db.Integer, default=1)
     assigned_users = db.relationship('User', secondary='security_job_assignments', backref='assigned_jobs')
     status = db.Column(db.String(50), default='open')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def to_dict(self):
@@ -338,7 +372,7 @@ class BarInventory(db.Model):
     __tablename__ = 'bar_inventory'
     
     id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey('bar_items.id'), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('bar_items.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False, default=0)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -355,6 +389,10 @@ class BarInventory(db.Model):
 
 class BarTransaction(db.Model):
     __tablename__ = 'bar_transactions'
+    __table_args__ = (
+        db.Index('ix_bar_transactions_bartender_id_completed_at', 'bartender_id', 'completed_at'),
+        db.Index('ix_bar_transactions_completed_at_id', 'completed_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     bartender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -363,7 +401,7 @@ class BarTransaction(db.Model):
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     discount_applied = db.Column(db.Numeric(5, 2), default=0)  # discount percentage
     actual_amount = db.Column(db.Numeric(10, 2), nullable=False)
-    completed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     bartender = db.relationship('User', foreign_keys=[bartender_id], backref='bar_transactions_as_bartender')
     customer = db.relationship('User', foreign_keys=[customer_id], backref='bar_transactions_as_customer')
@@ -386,7 +424,7 @@ class BarPayout(db.Model):
     __tablename__ = 'bar_payouts'
 
     id = db.Column(db.Integer, primary_key=True)
-    bartender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    bartender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     amount = db.Column(db.Numeric(10, 2), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -399,4 +437,27 @@ class BarPayout(db.Model):
             'bartender_name': self.bartender.username if self.bartender else None,
             'amount': float(self.amount),
             'created_at': self.created_at.isoformat(),
-        }
\ No newline at end of file
+        }
+class BartenderBalance(db.Model):
+    __tablename__ = 'bartender_balances'
+
+    bartender_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_sales = db.Column(db.Numeric(12, 2), nullable=False, default=Decimal('0.00'))
+    total_payouts = db.Column(db.Numeric(12, 2), nullable=False, default=Decimal('0.00'))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'bartender_id': self.bartender_id,
+            'total_sales': float(self.total_sales),
+            'total_payouts': float(self.total_payouts),
+            'outstanding': float(self.total_sales - self.total_payouts),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+
+    filename = db.Column(db.String(255), primary_key=True)
+    checksum = db.Column(db.String(64), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
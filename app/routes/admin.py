@@ -1,19 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from sqlalchemy import func
 from app import db
 from app.models import User, Invitation, EventConfig, RoleSalary, Ticket, ManagerCall, SecurityJob
-from app.middleware.auth import require_admin, require_auth
-from app.services import cache
+from app.middleware.auth import require_admin, require_admin_or_metrics_token, require_auth, invalidate_principal
+from app.services import cache, dashboard, event_snapshots, events, metrics, pagination, pricing, queries, serializers, streaming, ticket_bulk, ticket_index, ticket_signing
+from app.services.query_audit import query_budget
 from datetime import datetime
 from decimal import Decimal
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
-@admin_bp.route('/users', methods=['GET'])
-@require_admin
-def get_users():
-    users = User.query.order_by(User.created_at.desc()).all()
-    return jsonify([{
+def _user_row(u):
+    return {
         'id': u.id,
         'instagram_id': u.instagram_id,
         'username': u.username,
@@ -21,7 +19,21 @@ def get_users():
         'is_admin': u.is_admin,
         'is_banned': u.is_banned,
         'created_at': u.created_at.isoformat() if u.created_at else None,
-    } for u in users])
+    }
+
+def users_payload():
+    users = User.query.order_by(User.created_at.desc()).all()
+    return [_user_row(u) for u in users]
+
+@admin_bp.route('/users', methods=['GET'])
+@require_admin
+def get_users():
+    query = pagination.filter_query(User.query, role=User.role, username=User.username, created=User.created_at)
+    if request.args.get('status') in ('banned', 'active'):
+        query = query.filter(User.is_banned == (request.args['status'] == 'banned'))
+    if pagination.requested():
+        return jsonify(pagination.paginate(query, User.created_at, User.id, _user_row))
+    return jsonify([_user_row(u) for u in query.order_by(User.created_at.desc()).all()])
 
 @admin_bp.route('/users/<int:user_id>/ban', methods=['POST'])
 @require_admin
@@ -31,8 +43,11 @@ def ban_user(user_id):
         return jsonify({'error': 'User not found'}), 404
     
     user.is_banned = True
+    user.banned_at = datetime.utcnow()
     db.session.commit()
     cache.delete('users:all')
+    invalidate_principal(user.id)
+    ticket_signing.refresh_revocations()
     
     return jsonify({'success': True})
 
@@ -44,8 +59,11 @@ def unban_user(user_id):
         return jsonify({'error': 'User not found'}), 404
     
     user.is_banned = False
+    user.banned_at = None
     db.session.commit()
     cache.delete('users:all')
+    invalidate_principal(user.id)
+    ticket_signing.refresh_revocations()
     
     return jsonify({'success': True})
 
@@ -66,27 +84,39 @@ def set_role(user_id):
     user.is_admin = (role == 'admin')
     db.session.commit()
     cache.delete('users:all')
+    cache.delete('admin:inspector-payments')
+    invalidate_principal(user.id)
+    ticket_index.refresh_user(user.id)
 
     return jsonify({'success': True, 'role': role, 'is_admin': user.is_admin})
 
-@admin_bp.route('/invitations', methods=['GET'])
-@require_admin
-def get_invitations():
-    invitations = Invitation.query.all()
-    return jsonify([{
+def _invitation_row(inv):
+    return {
         'id': inv.id,
         'inviterId': inv.inviter_id,
-        'inviterUsername': User.query.get(inv.inviter_id).username if inv.inviter_id else None,
+        'inviterUsername': inv.inviter_username,
         'inviteeUsername': inv.invitee_username,
         'inviteeInstagramId': inv.invitee_instagram_id,
         'status': inv.status,
         'createdAt': inv.created_at.isoformat() if inv.created_at else None,
         'acceptedAt': inv.accepted_at.isoformat() if inv.accepted_at else None
-    } for inv in invitations])
+    }
 
-@admin_bp.route('/config', methods=['GET'])
+def invitations_payload():
+    return [_invitation_row(inv) for inv in queries.invitations_with_inviter().all()]
+
+@admin_bp.route('/invitations', methods=['GET'])
 @require_admin
-def get_config():
+def get_invitations():
+    query = pagination.filter_query(
+        queries.invitations_with_inviter(),
+        status=Invitation.status, username=Invitation.invitee_username, created=Invitation.created_at
+    )
+    if pagination.requested():
+        return jsonify(pagination.paginate(query, Invitation.created_at, Invitation.id, _invitation_row))
+    return streaming.json_array_response(query.order_by(Invitation.id), _invitation_row)
+
+def get_or_create_config():
     config = EventConfig.query.first()
     if not config:
         config = EventConfig(
@@ -96,6 +126,11 @@ def get_config():
         )
         db.session.add(config)
         db.session.commit()
+        event_snapshots.publish()
+    return config
+
+def config_payload():
+    config = get_or_create_config()
     
     base_price = float(config.ticket_price) if config.ticket_price is not None else None
     max_disc = float(config.max_discount_percent) if config.max_discount_percent is not None else 0.0
@@ -104,7 +139,7 @@ def get_config():
     if base_price is not None:
         min_price = round(base_price * (1 - max_disc / 100), 2)
 
-    return jsonify({
+    return {
         'id': config.id,
         'eventDate': config.event_date.isoformat() if config.event_date else None,
         'eventPlace': config.event_place,
@@ -126,7 +161,12 @@ def get_config():
         'releaseDateEventPlace': config.release_date_event_place.isoformat() if config.release_date_event_place else None,
         'currency': config.currency,
         'ticketQrEnabled': config.ticket_qr_enabled
-    })
+    }
+
+@admin_bp.route('/config', methods=['GET'])
+@require_admin
+def get_config():
+    return jsonify(config_payload())
 
 @admin_bp.route('/config', methods=['PUT'])
 @require_admin
@@ -186,14 +226,18 @@ def update_config():
     
     db.session.add(config)
     db.session.commit()
-    cache.delete('event:config')
+    cache.delete('admin:inspector-payments')
+    event_snapshots.publish()
+    ticket_index.refresh_pricing()
     
     return jsonify({'success': True})
+def salaries_payload():
+    return [s.to_dict() for s in RoleSalary.query.all()]
+
 @admin_bp.route('/salaries', methods=['GET'])
 @require_auth
 def get_salaries():
-    salaries = RoleSalary.query.all()
-    return jsonify([s.to_dict() for s in salaries])
+    return jsonify(salaries_payload())
 
 @admin_bp.route('/salaries/<role>', methods=['PUT'])
 @require_admin
@@ -218,54 +262,70 @@ def update_salary(role):
     
     return jsonify(role_salary.to_dict())
 
-@admin_bp.route('/inspector-payments', methods=['GET'])
-@require_admin
-def get_inspector_payments():
+def inspector_payments_payload():
     """Get payment totals for each ticket inspector"""
-    inspectors = User.query.filter_by(role='ticket-inspector').all()
-    config = EventConfig.query.first()
+    cached = cache.get('admin:inspector-payments')
+    if cached is not None:
+        return cached
+    
+    config = pricing.pricing_config(EventConfig.query.first())
+    
+    # accepted invites per ticket holder decide the price, so bucket the
+    # verified tickets by (inspector, invite count) in a single pass
+    invite_counts = db.session.query(
+        Invitation.inviter_id.label('user_id'),
+        func.count(Invitation.id).label('invites')
+    ).filter(Invitation.status == 'accepted').group_by(Invitation.inviter_id).subquery()
+    invites = func.coalesce(invite_counts.c.invites, 0)
+    buckets = db.session.query(
+        Ticket.verified_by, invites, func.count(Ticket.id)
+    ).join(User, Ticket.user_id == User.id).outerjoin(
+        invite_counts, invite_counts.c.user_id == Ticket.user_id
+    ).filter(
+        Ticket.verified_by.isnot(None),
+        User.role == 'user'
+    ).group_by(Ticket.verified_by, invites).all()
+    
+    totals = {}
+    for inspector_id, accepted_invites, ticket_count in buckets:
+        collected, verified = totals.get(inspector_id, (0.0, 0))
+        totals[inspector_id] = (
+            collected + pricing.unit_price(config, accepted_invites) * ticket_count,
+            verified + ticket_count
+        )
     
     result = []
+    inspectors = db.session.query(User.id, User.username).filter_by(role='ticket-inspector').all()
     for inspector in inspectors:
-        # Get all verified tickets by this inspector (from regular users only)
-        verified_tickets = Ticket.query.join(User, Ticket.user_id == User.id).filter(
-            Ticket.verified_by == inspector.id,
-            User.role == 'user'
-        ).all()
-        
-        total_collected = 0.0
-        
-        if config and config.ticket_price:
-            base_price = float(config.ticket_price)
-            max_discount_pct = float(config.max_discount_percent) if config.max_discount_percent else 0
-            max_invites = config.max_invites_per_user or 1
-            
-            # Calculate total for each verified ticket
-            for ticket in verified_tickets:
-                accepted_invites = Invitation.query.filter_by(
-                    inviter_id=ticket.user_id,
-                    status='accepted'
-                ).count()
-                
-                discount_fraction = min(accepted_invites / max_invites, 1.0) if max_invites > 0 else 0
-                discount_pct = max_discount_pct * discount_fraction
-                ticket_price = base_price * (1 - discount_pct / 100)
-                total_collected += ticket_price
-        
+        total_collected, verified_count = totals.get(inspector.id, (0.0, 0))
         result.append({
             'inspector_id': inspector.id,
             'inspector_name': inspector.username,
             'total_collected': round(total_collected, 2),
-            'verified_count': len(verified_tickets)
+            'verified_count': verified_count
         })
     
-    return jsonify(result)
+    cache.set('admin:inspector-payments', result)
+    return result
+
+@admin_bp.route('/inspector-payments', methods=['GET'])
+@require_admin
+def get_inspector_payments():
+    return jsonify(inspector_payments_payload())
+
+def manager_calls_payload():
+    view = serializers.MANAGER_CALLS
+    return view.all(view.query().order_by(ManagerCall.created_at.desc()))
 
 @admin_bp.route('/manager-calls', methods=['GET'])
 @require_admin
+@query_budget(3)
 def get_manager_calls():
-    calls = ManagerCall.query.order_by(ManagerCall.created_at.desc()).all()
-    return jsonify([c.to_dict() for c in calls])
+    view = serializers.MANAGER_CALLS
+    query = pagination.filter_query(view.query(), status=ManagerCall.status, created=ManagerCall.created_at)
+    if pagination.requested():
+        return jsonify(pagination.paginate(query, ManagerCall.created_at, ManagerCall.id, view.serialize_all, many=True))
+    return jsonify(view.all(query.order_by(ManagerCall.created_at.desc())))
 
 @admin_bp.route('/manager-calls/<int:call_id>/resolve', methods=['POST'])
 @require_admin
@@ -278,13 +338,23 @@ def resolve_manager_call(call_id):
     call.resolved_at = datetime.utcnow()
     db.session.commit()
     
-    return jsonify(call.to_dict())
+    payload = call.to_dict()
+    events.publish('manager_calls', 'resolved', payload)
+    return jsonify(payload)
+
+def security_jobs_payload():
+    view = serializers.SECURITY_JOBS
+    return view.all(view.query().order_by(SecurityJob.created_at.desc()))
 
 @admin_bp.route('/security-jobs', methods=['GET'])
 @require_admin
+@query_budget(4)
 def get_security_jobs():
-    jobs = SecurityJob.query.order_by(SecurityJob.created_at.desc()).all()
-    return jsonify([j.to_dict() for j in jobs])
+    view = serializers.SECURITY_JOBS
+    query = pagination.filter_query(view.query(), status=SecurityJob.status, created=SecurityJob.created_at)
+    if pagination.requested():
+        return jsonify(pagination.paginate(query, SecurityJob.created_at, SecurityJob.id, view.serialize_all, many=True))
+    return jsonify(view.all(query.order_by(SecurityJob.created_at.desc())))
 
 @admin_bp.route('/security-jobs', methods=['POST'])
 @require_admin
@@ -300,7 +370,9 @@ def create_security_job():
     db.session.add(job)
     db.session.commit()
     
-    return jsonify(job.to_dict()), 201
+    payload = job.to_dict()
+    events.publish('security', 'created', payload)
+    return jsonify(payload), 201
 
 @admin_bp.route('/security-jobs/<int:job_id>', methods=['PUT'])
 @require_admin
@@ -322,7 +394,9 @@ def update_security_job(job_id):
     
     db.session.commit()
     
-    return jsonify(job.to_dict())
+    payload = job.to_dict()
+    events.publish('security', 'updated', payload)
+    return jsonify(payload)
 
 @admin_bp.route('/security-jobs/<int:job_id>', methods=['DELETE'])
 @require_admin
@@ -334,4 +408,59 @@ def delete_security_job(job_id):
     db.session.delete(job)
     db.session.commit()
     
+    events.publish('security', 'deleted', {'id': job_id})
     return jsonify({'success': True})
+
+
+@admin_bp.route('/tickets/generate-all', methods=['POST'])
+@require_admin
+def generate_all_tickets():
+    job_id = ticket_bulk.start()
+    if not job_id:
+        return jsonify({'error': 'Ticket generation is already running'}), 409
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
+@admin_bp.route('/tickets/generate-all/<job_id>', methods=['GET'])
+@require_admin
+def generate_all_tickets_status(job_id):
+    status = ticket_bulk.status(job_id)
+    if not status:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status)
+
+@admin_bp.route('/dashboard', methods=['GET'])
+@require_admin
+@query_budget(25)
+def get_dashboard():
+    """Snapshot of every admin panel section; with ?since=<version> only changed sections are returned"""
+    from app.routes import bar
+    builders = {
+        'users': users_payload,
+        'invitations': invitations_payload,
+        'config': config_payload,
+        'salaries': salaries_payload,
+        'inspector_payments': inspector_payments_payload,
+        'manager_calls': manager_calls_payload,
+        'security_jobs': security_jobs_payload,
+        'bar_items': bar.bar_items_payload,
+        'invite_discounts': bar.invite_discounts_payload,
+        'preset_discounts': bar.preset_discounts_payload,
+        'inventory': bar.inventory_payload,
+        'bartender_balances': bar.bartender_balances_payload,
+    }
+    
+    get_or_create_config()
+    versions = dashboard.section_versions()
+    previous = dashboard.decode_version(request.args.get('since'))
+    changed = [name for name in dashboard.SECTIONS if previous.get(name) != versions[name]]
+    
+    return jsonify({
+        'version': dashboard.encode_version(versions),
+        'changed': changed,
+        'sections': {name: builders[name]() for name in changed}
+    })
+
+@admin_bp.route('/metrics', methods=['GET'])
+@require_admin_or_metrics_token
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -1,17 +1,15 @@
 from flask import Blueprint, request, jsonify, session
 from app import db
 from app.models import User, Invitation, EventConfig
-from app.middleware.auth import require_auth
+from app.middleware.auth import require_auth, load_principal, invalidate_principal, is_env_admin
 from app.services.instagram_bot import InstagramBot
-from app.services import cache
+from app.services import cache, otp_store, ticket_index
 import random
-import time
 import os
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 bot = InstagramBot()
-otp_store = {}
 
 def generate_otp():
     return f'{random.randint(100000, 999999)}'
@@ -26,10 +24,7 @@ def request_otp():
             return jsonify({'error': 'Instagram username required'}), 400
         
         otp = generate_otp()
-        otp_store[username] = {
-            'otp': otp,
-            'expires_at': time.time() + 600
-        }
+        otp_store.get_store().issue(username, otp)
         
         message = f'Event Pyramide\n\nYour verification code: {otp}\n\nValid for 10 minutes.'
         
@@ -58,22 +53,20 @@ def verify_otp():
         if not username or not otp:
             return jsonify({'error': 'Username and code required'}), 400
         
-        stored = otp_store.get(username)
-        if not stored:
+        result = otp_store.get_store().verify(username, otp)
+        if result == otp_store.MISSING:
             return jsonify({'error': 'No code requested or expired'}), 400
         
-        if time.time() > stored['expires_at']:
-            del otp_store[username]
+        if result == otp_store.EXPIRED:
             return jsonify({'error': 'Code expired'}), 400
         
-        if stored['otp'] != otp:
-            return jsonify({'error': 'Invalid code'}), 400
+        if result == otp_store.LOCKED:
+            return jsonify({'error': 'Too many attempts, try again later'}), 429
         
-        del otp_store[username]
+        if result != otp_store.OK:
+            return jsonify({'error': 'Invalid code'}), 400
         
-        admin_usernames = os.getenv('ADMIN_INSTAGRAM_USERNAMES', '').split(',')
-        admin_usernames = [u.strip().lower() for u in admin_usernames if u.strip()]
-        is_admin = username in admin_usernames
+        is_admin = is_env_admin(username)
         
         user = User.query.filter_by(username=username).first()
         
@@ -96,17 +89,23 @@ def verify_otp():
                 invitation.status = 'accepted'
                 invitation.accepted_at = datetime.utcnow()
                 db.session.commit()
+                ticket_index.refresh_user(invitation.inviter_id)
+                cache.delete('admin:inspector-payments')
         else:
             if is_admin:
                 user.role = 'admin'
                 user.is_admin = True
                 db.session.commit()
+                invalidate_principal(user.id)
+                ticket_index.refresh_user(user.id)
             
             invitation = Invitation.query.filter_by(invitee_username=username).first()
             if invitation and invitation.status == 'pending':
                 invitation.status = 'accepted'
                 invitation.accepted_at = datetime.utcnow()
                 db.session.commit()
+                ticket_index.refresh_user(invitation.inviter_id)
+                cache.delete('admin:inspector-payments')
         
         session['user_id'] = user.id
         session.permanent = True
@@ -127,7 +126,7 @@ def verify_otp():
 def check_status():
     try:
         if 'user_id' in session:
-            user = User.query.get(session['user_id'])
+            user = load_principal(session['user_id'])
             if user:
                 return jsonify({
                     'authenticated': True,
@@ -162,12 +161,12 @@ def set_attendance():
         if attending is None:
             return jsonify({'error': 'Attending status required'}), 400
         
-        user = User.query.get(user_id)
-        if not user:
+        updated = User.query.filter_by(id=user_id).update({'attending': attending})
+        if not updated:
             return jsonify({'error': 'User not found'}), 404
         
-        user.attending = attending
         db.session.commit()
+        invalidate_principal(user_id)
         
         return jsonify({'success': True, 'attending': attending})
     except Exception as e:
@@ -3,32 +3,58 @@ from app import db
 from app.models import BarItem, InviteDiscount, PresetDiscount, User, BarInventory, BarTransaction, BarPayout
 from app.middleware.auth import require_auth, require_admin
 from sqlalchemy import func
+from app.services import bar_ledger, http_cache, inventory, pagination, serializers, ticket_index
+from app.services.query_audit import query_budget
 
 bar_bp = Blueprint('bar', __name__, url_prefix='/api/bar')
 
+# bartender clients revalidate every time; an unchanged menu costs a 304
+MENU_CACHE_CONTROL = 'private, no-cache'
+
+def bar_items_version():
+    row = db.session.query(func.count(BarItem.id), func.max(BarItem.id), func.max(BarItem.updated_at)).one()
+    return {'version': http_cache.digest(*row)}
+
+def invite_discounts_version():
+    row = db.session.query(func.count(InviteDiscount.id), func.max(InviteDiscount.id), func.max(InviteDiscount.updated_at)).one()
+    return {'version': http_cache.digest(*row)}
+
 @bar_bp.route('/items', methods=['GET'])
 @require_auth
+@query_budget(3)
 def get_items():
-    items = BarItem.query.filter_by(available=True).all()
-    return jsonify([item.to_dict() for item in items])
+    record = http_cache.content_version('bar-items', bar_items_version)
+    return http_cache.conditional(
+        f"bar-items-{record['version']}", MENU_CACHE_CONTROL,
+        lambda: jsonify([item.to_dict() for item in BarItem.query.filter_by(available=True).all()])
+    )
 
 @bar_bp.route('/discounts', methods=['GET'])
 @require_auth
+@query_budget(3)
 def get_discounts():
-    discounts = InviteDiscount.query.order_by(InviteDiscount.invite_count).all()
-    return jsonify([d.to_dict() for d in discounts])
+    record = http_cache.content_version('invite-discounts', invite_discounts_version)
+    return http_cache.conditional(
+        f"invite-discounts-{record['version']}", MENU_CACHE_CONTROL,
+        lambda: jsonify([d.to_dict() for d in InviteDiscount.query.order_by(InviteDiscount.invite_count).all()])
+    )
 
 @bar_bp.route('/inventory', methods=['GET'])
 @require_auth
+@query_budget(3)
 def get_inventory():
-    inventory = BarInventory.query.all()
-    return jsonify([inv.to_dict() for inv in inventory])
+    return jsonify(serializers.INVENTORY.all())
 
 @bar_bp.route('/transactions', methods=['POST'])
 @require_auth
+@query_budget(8)
 def create_transaction():
     data = request.get_json()
     
+    stock_mode = data.get('stock_mode', inventory.CLAMP)
+    if stock_mode not in inventory.MODES:
+        return jsonify({'error': f"stock_mode must be one of {', '.join(inventory.MODES)}"}), 400
+    
     transaction = BarTransaction(
         bartender_id=data.get('bartender_id'),
         customer_id=data.get('customer_id'),
@@ -39,29 +65,36 @@ def create_transaction():
     )
     
     items_dict = data.get('items_json', {})
+    quantities = {}
     for item_id_str, quantity in items_dict.items():
         item_id = int(item_id_str)
-        inv = BarInventory.query.filter_by(item_id=item_id).first()
-        if inv:
-            inv.quantity -= quantity
-            if inv.quantity < 0:
-                inv.quantity = 0
+        quantities[item_id] = quantities.get(item_id, 0) + quantity
+    
+    try:
+        stock = inventory.decrement(quantities, stock_mode)
+    except inventory.InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'error': 'Insufficient stock', 'shortages': e.shortages}), 409
     
     db.session.add(transaction)
+    bar_ledger.record_sale(transaction.bartender_id, transaction.actual_amount)
     db.session.commit()
     
     return jsonify({
         'success': True,
-        'transaction': transaction.to_dict()
+        'transaction': transaction.to_dict(),
+        'stock': stock
     }), 201
 
 admin_bar_bp = Blueprint('admin_bar', __name__, url_prefix='/api/admin')
 
+def bar_items_payload():
+    return [item.to_dict() for item in BarItem.query.all()]
+
 @admin_bar_bp.route('/bar-items', methods=['GET'])
 @require_admin
 def get_all_items():
-    items = BarItem.query.all()
-    return jsonify([item.to_dict() for item in items])
+    return jsonify(bar_items_payload())
 
 @admin_bar_bp.route('/bar-items', methods=['POST'])
 @require_admin
@@ -76,6 +109,7 @@ def create_item():
     )
     db.session.add(item)
     db.session.commit()
+    http_cache.invalidate('bar-items')
     return jsonify(item.to_dict()), 201
 
 @admin_bar_bp.route('/bar-items/<int:item_id>', methods=['PUT'])
@@ -101,6 +135,7 @@ def update_item(item_id):
     if available is not None:
         item.available = bool(available)
     db.session.commit()
+    http_cache.invalidate('bar-items')
     return jsonify(item.to_dict())
 
 @admin_bar_bp.route('/bar-items/<int:item_id>', methods=['DELETE'])
@@ -117,13 +152,17 @@ def delete_item(item_id):
     
     db.session.delete(item)
     db.session.commit()
+    http_cache.invalidate('bar-items')
     return jsonify({'success': True})
 
+def invite_discounts_payload():
+    discounts = InviteDiscount.query.order_by(InviteDiscount.invite_count).all()
+    return [d.to_dict() for d in discounts]
+
 @admin_bar_bp.route('/invite-discounts', methods=['GET'])
 @require_admin
 def get_invite_discounts():
-    discounts = InviteDiscount.query.order_by(InviteDiscount.invite_count).all()
-    return jsonify([d.to_dict() for d in discounts])
+    return jsonify(invite_discounts_payload())
 
 @admin_bar_bp.route('/invite-discounts', methods=['POST'])
 @require_admin
@@ -135,6 +174,8 @@ def create_invite_discount():
     )
     db.session.add(discount)
     db.session.commit()
+    http_cache.invalidate('invite-discounts')
+    ticket_index.refresh_pricing()
     return jsonify(discount.to_dict()), 201
 
 @admin_bar_bp.route('/invite-discounts/<int:discount_id>', methods=['DELETE'])
@@ -145,13 +186,18 @@ def delete_invite_discount(discount_id):
         return jsonify({'error': 'Discount not found'}), 404
     db.session.delete(discount)
     db.session.commit()
+    http_cache.invalidate('invite-discounts')
+    ticket_index.refresh_pricing()
     return jsonify({'success': True})
 
+def preset_discounts_payload():
+    return serializers.PRESET_DISCOUNTS.all()
+
 @admin_bar_bp.route('/preset-discounts', methods=['GET'])
 @require_admin
+@query_budget(3)
 def get_preset_discounts():
-    discounts = PresetDiscount.query.all()
-    return jsonify([d.to_dict() for d in discounts])
+    return jsonify(preset_discounts_payload())
 
 @admin_bar_bp.route('/preset-discounts', methods=['POST'])
 @require_admin
@@ -170,6 +216,7 @@ def create_preset_discount():
     )
     db.session.add(discount)
     db.session.commit()
+    ticket_index.refresh_user(user.id)
     return jsonify(discount.to_dict()), 201
 
 @admin_bar_bp.route('/preset-discounts/<int:discount_id>', methods=['DELETE'])
@@ -178,14 +225,19 @@ def delete_preset_discount(discount_id):
     discount = PresetDiscount.query.get(discount_id)
     if not discount:
         return jsonify({'error': 'Discount not found'}), 404
+    user_id = discount.user_id
     db.session.delete(discount)
     db.session.commit()
+    ticket_index.refresh_user(user_id)
     return jsonify({'success': True})
+def inventory_payload():
+    return serializers.INVENTORY.all()
+
 @admin_bar_bp.route('/inventory', methods=['GET'])
 @require_admin
+@query_budget(3)
 def get_all_inventory():
-    inventory = BarInventory.query.all()
-    return jsonify([inv.to_dict() for inv in inventory])
+    return jsonify(inventory_payload())
 
 @admin_bar_bp.route('/inventory', methods=['POST'])
 @require_admin
@@ -223,33 +275,33 @@ def update_inventory(item_id):
 
 @admin_bar_bp.route('/transactions', methods=['GET'])
 @require_admin
+@query_budget(3)
 def get_all_transactions():
-    transactions = BarTransaction.query.order_by(BarTransaction.completed_at.desc()).all()
-    return jsonify([t.to_dict() for t in transactions])
+    view = serializers.TRANSACTIONS
+    query = pagination.filter_query(view.query(), created=BarTransaction.completed_at)
+    bartender_id = request.args.get('bartender_id', type=int)
+    if bartender_id:
+        query = query.filter(BarTransaction.bartender_id == bartender_id)
+    if pagination.requested():
+        return jsonify(pagination.paginate(
+            query, BarTransaction.completed_at, BarTransaction.id, view.serialize_all, many=True
+        ))
+    return jsonify(view.all(query.order_by(BarTransaction.completed_at.desc())))
 
 @admin_bar_bp.route('/transactions/bartender/<int:bartender_id>', methods=['GET'])
 @require_admin
+@query_budget(3)
 def get_bartender_transactions(bartender_id):
-    transactions = BarTransaction.query.filter_by(bartender_id=bartender_id).order_by(BarTransaction.completed_at.desc()).all()
-    return jsonify([t.to_dict() for t in transactions])
+    query = serializers.TRANSACTIONS.query().filter(BarTransaction.bartender_id == bartender_id)
+    return jsonify(serializers.TRANSACTIONS.all(query.order_by(BarTransaction.completed_at.desc())))
+
+def bartender_balances_payload():
+    return bar_ledger.balances()
 
 @admin_bar_bp.route('/bartender-balances', methods=['GET'])
 @require_admin
 def get_bartender_balances():
-    bartenders = User.query.filter_by(role='bartender').all()
-    balances = []
-    for b in bartenders:
-        total_sales = db.session.query(func.coalesce(func.sum(BarTransaction.actual_amount), 0)).filter(BarTransaction.bartender_id == b.id).scalar() or 0
-        total_payouts = db.session.query(func.coalesce(func.sum(BarPayout.amount), 0)).filter(BarPayout.bartender_id == b.id).scalar() or 0
-        outstanding = float(total_sales) - float(total_payouts)
-        balances.append({
-            'bartender_id': b.id,
-            'bartender_name': b.username,
-            'total_sales': float(total_sales),
-            'total_payouts': float(total_payouts),
-            'outstanding': outstanding
-        })
-    return jsonify(balances)
+    return jsonify(bartender_balances_payload())
 
 @admin_bar_bp.route('/bartender-payouts', methods=['POST'])
 @require_admin
@@ -262,13 +314,11 @@ def create_bartender_payout():
     bartender = User.query.get(bartender_id)
     if not bartender or bartender.role != 'bartender':
         return jsonify({'error': 'Bartender not found'}), 404
-    total_sales = db.session.query(func.coalesce(func.sum(BarTransaction.actual_amount), 0)).filter(BarTransaction.bartender_id == bartender_id).scalar() or 0
-    total_payouts = db.session.query(func.coalesce(func.sum(BarPayout.amount), 0)).filter(BarPayout.bartender_id == bartender_id).scalar() or 0
-    outstanding = float(total_sales) - float(total_payouts)
     amt = float(amount)
     if amt <= 0:
         return jsonify({'error': 'Amount must be positive'}), 400
-    if amt > outstanding + 1e-6:
+    if not bar_ledger.record_payout(bartender_id, amt):
+        db.session.rollback()
         return jsonify({'error': 'Amount exceeds outstanding balance'}), 400
     payout = BarPayout(bartender_id=bartender_id, amount=amt)
     db.session.add(payout)
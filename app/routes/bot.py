@@ -33,7 +33,29 @@ def broadcast():
         return jsonify({'error': 'Content is required'}), 400
     
     try:
-        results = bot.broadcast_update(content)
-        return jsonify({'success': True, 'results': results})
+        from app.services.broadcast import BroadcastEngine
+        engine = BroadcastEngine(bot=bot)
+        job_id = engine.start(engine.create_job(content))
+        return jsonify({'success': True, 'job_id': job_id}), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@bot_bp.route('/broadcast/<job_id>', methods=['GET'])
+@require_admin
+def broadcast_status(job_id):
+    from app.services.broadcast import BroadcastEngine
+    status = BroadcastEngine(bot=bot).status(job_id)
+    if status['state'] == 'missing':
+        return jsonify({'error': 'Broadcast not found'}), 404
+    return jsonify(status)
+
+@bot_bp.route('/broadcast/<job_id>/resume', methods=['POST'])
+@require_admin
+def resume_broadcast(job_id):
+    from app.services.broadcast import BroadcastEngine
+    engine = BroadcastEngine(bot=bot)
+    if engine.status(job_id)['state'] == 'missing':
+        return jsonify({'error': 'Broadcast not found'}), 404
+    if not engine.resume(job_id):
+        return jsonify({'error': 'Broadcast is still running'}), 409
+    return jsonify({'success': True, 'job_id': job_id}), 202
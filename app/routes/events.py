@@ -0,0 +1,44 @@
+import os
+import threading
+from flask import Blueprint, Response, request, jsonify
+from werkzeug.wsgi import ClosingIterator
+from app import db
+from app.middleware.auth import require_auth, is_env_admin
+from app.services import events
+
+events_bp = Blueprint('events', __name__, url_prefix='/api/events')
+
+# Every open stream holds a server thread. In production Caddy sends streams to
+# a separate gunicorn process with threads to spare (docker/entrypoint.sh); by
+# default any other process gives at most half of its threads to streams.
+MAX_STREAMS = int(os.getenv('EVENT_MAX_STREAMS', max(1, int(os.getenv('GUNICORN_THREADS', 4)) // 2)))
+_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+def _allowed_channels(user):
+    is_admin = user.is_admin or user.role == 'admin' or is_env_admin(user.username)
+    allowed = set()
+    if is_admin or user.role == 'security':
+        allowed.add('security')
+    if is_admin:
+        allowed.add('manager_calls')
+    return allowed
+
+@events_bp.route('/stream', methods=['GET'])
+@require_auth
+def stream():
+    allowed = _allowed_channels(request.user)
+    requested = set(filter(None, request.args.get('channels', '').split(','))) or allowed
+    if not requested or not requested <= allowed:
+        return jsonify({'error': 'Forbidden: Access denied'}), 403
+    
+    if not _slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many open streams'}), 503, {'Retry-After': '30'}
+    
+    # the stream outlives the request's use of the database; hand the connection back now
+    db.session.close()
+    
+    return Response(
+        ClosingIterator(events.subscribe(requested, request.headers.get('Last-Event-ID')), [_slots.release]),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -3,7 +3,7 @@ from sqlalchemy import func
 from app import db
 from app.models import User, Invitation, EventConfig
 from app.middleware.auth import require_auth
-from app.services import cache
+from app.services import cache, ticket_index
 
 invitations_bp = Blueprint('invitations', __name__, url_prefix='/api/invitations')
 
@@ -33,7 +33,7 @@ def create_invitation():
     if not instagram_id or not username:
         return jsonify({'error': 'Instagram ID and username are required'}), 400
     
-    user = User.query.get(user_id)
+    user = request.user
     if user.is_banned:
         return jsonify({'error': 'Your account is banned and cannot send invitations'}), 403
     
@@ -86,13 +86,18 @@ def delete_invitation(invitation_id):
     if not invitation:
         return jsonify({'error': 'Invitation not found'}), 404
     
-    user = User.query.get(user_id)
+    user = request.user
     if invitation.inviter_id != user_id and user.role != 'admin':
         return jsonify({'error': 'Not authorized to delete this invitation'}), 403
     
     try:
+        inviter_id = invitation.inviter_id
+        was_accepted = invitation.status == 'accepted'
         db.session.delete(invitation)
         db.session.commit()
+        if was_accepted:
+            ticket_index.refresh_user(inviter_id)
+            cache.delete('admin:inspector-payments')
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
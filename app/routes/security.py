@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import SecurityJob, User
 from app.middleware.auth import require_auth, require_role
+from app.services import events, serializers
+from app.services.query_audit import query_budget
 from datetime import datetime
 from sqlalchemy import desc
 
@@ -9,16 +11,16 @@ security_bp = Blueprint('security', __name__, url_prefix='/api/security')
 
 @security_bp.route('/incidents', methods=['GET'])
 @require_role(['security', 'admin'])
+@query_budget(4)
 def get_incidents():
     limit = request.args.get('limit', 10, type=int)
     status = request.args.get('status', 'open')
     
-    query = SecurityJob.query
+    query = serializers.SECURITY_JOBS.query()
     if status and status != 'all':
-        query = query.filter_by(status=status)
+        query = query.filter(SecurityJob.status == status)
     
-    jobs = query.order_by(desc(SecurityJob.created_at)).limit(limit).all()
-    return jsonify([j.to_dict() for j in jobs])
+    return jsonify(serializers.SECURITY_JOBS.all(query.order_by(desc(SecurityJob.created_at)).limit(limit)))
 
 @security_bp.route('/incidents', methods=['POST'])
 @require_role(['security', 'admin'])
@@ -35,7 +37,9 @@ def create_incident():
     db.session.add(job)
     db.session.commit()
     
-    return jsonify(job.to_dict()), 201
+    payload = job.to_dict()
+    events.publish('security', 'created', payload)
+    return jsonify(payload), 201
 
 @security_bp.route('/incidents/<int:incident_id>', methods=['GET'])
 @require_role(['security', 'admin'])
@@ -62,7 +66,9 @@ def assign_incident(incident_id):
             job.assigned_users.append(user)
     
     db.session.commit()
-    return jsonify(job.to_dict())
+    payload = job.to_dict()
+    events.publish('security', 'assigned', payload)
+    return jsonify(payload)
 
 @security_bp.route('/incidents/<int:incident_id>/unassign', methods=['POST'])
 @require_role(['admin'])
@@ -79,7 +85,9 @@ def unassign_incident(incident_id):
         job.assigned_users.remove(user)
     
     db.session.commit()
-    return jsonify(job.to_dict())
+    payload = job.to_dict()
+    events.publish('security', 'unassigned', payload)
+    return jsonify(payload)
 
 @security_bp.route('/incidents/<int:incident_id>/status', methods=['PUT'])
 @require_role(['security', 'admin'])
@@ -96,7 +104,9 @@ def update_incident_status(incident_id):
     
     job.status = status
     db.session.commit()
-    return jsonify(job.to_dict())
+    payload = job.to_dict()
+    events.publish('security', 'status', payload)
+    return jsonify(payload)
 
 @security_bp.route('/incidents/<int:incident_id>/self-assign', methods=['POST'])
 @require_role(['security'])
@@ -105,10 +115,11 @@ def self_assign_incident(incident_id):
     if not job:
         return jsonify({'error': 'Incident not found'}), 404
     
-    user = request.user
+    user = User.query.get(request.user.id)
     if user not in job.assigned_users:
         job.assigned_users.append(user)
         db.session.commit()
+        events.publish('security', 'assigned', job.to_dict())
     
     return jsonify(job.to_dict())
 
@@ -119,9 +130,10 @@ def self_unassign_incident(incident_id):
     if not job:
         return jsonify({'error': 'Incident not found'}), 404
     
-    user = request.user
+    user = User.query.get(request.user.id)
     if user in job.assigned_users:
         job.assigned_users.remove(user)
         db.session.commit()
+        events.publish('security', 'unassigned', job.to_dict())
     
     return jsonify(job.to_dict())
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError
 from app import db
-from app.models import Ticket, User, SecurityIncident, EventConfig, Invitation, PresetDiscount, InviteDiscount
+from app.models import Ticket, EventConfig, Invitation
 from app.middleware.auth import require_auth, require_role
+from app.services import cache, pagination, pricing, serializers, ticket_index, ticket_signing, ticket_sync
+from app.services.query_audit import query_budget
 from datetime import datetime
 import uuid
 
@@ -9,6 +12,7 @@ tickets_bp = Blueprint('tickets', __name__, url_prefix='/api/tickets')
 
 @tickets_bp.route('/', methods=['GET'])
 @require_auth
+@query_budget(4)
 def get_my_ticket():
     user = request.user
     ticket = Ticket.query.filter_by(user_id=user.id).first()
@@ -20,6 +24,7 @@ def get_my_ticket():
 
 @tickets_bp.route('/generate', methods=['POST'])
 @require_auth
+@query_budget(12)
 def generate_ticket():
     user = request.user
     existing = Ticket.query.filter_by(user_id=user.id).first()
@@ -27,69 +32,66 @@ def generate_ticket():
     if existing:
         return jsonify(existing.to_dict())
     
+    holder = ticket_index.holder(user.id) if ticket_signing.enabled() else None
     qr_code = str(uuid.uuid4())
-    ticket = Ticket(user_id=user.id, qr_code=qr_code)
+    ticket = Ticket(user_id=user.id, qr_code=qr_code, change_seq=ticket_sync.next_change())
     db.session.add(ticket)
-    db.session.commit()
+    try:
+        if holder:
+            # the signed code covers the ticket id, which only exists after the insert
+            db.session.flush()
+            ticket.qr_code = ticket_signing.sign(ticket.id, holder)
+        db.session.commit()
+    except IntegrityError:
+        # a parallel request or the bulk job created it first; tickets.user_id is unique
+        db.session.rollback()
+        return jsonify(Ticket.query.filter_by(user_id=user.id).first().to_dict())
+    ticket_index.add_ticket(ticket)
     
     return jsonify(ticket.to_dict()), 201
 
 def calculate_ticket_price(user_id):
-    config = EventConfig.query.first()
-    if not config or config.ticket_price is None:
-        return 0.0
-    
-    base_price = float(config.ticket_price)
-    max_discount_pct = float(config.max_discount_percent) if config.max_discount_percent else 0
-    max_invites = config.max_invites_per_user or 1
-    
+    config = pricing.pricing_config(EventConfig.query.first())
     accepted_invites = Invitation.query.filter_by(inviter_id=user_id, status='accepted').count()
-    discount_fraction = min(accepted_invites / max_invites, 1.0) if max_invites > 0 else 0
-    discount_pct = max_discount_pct * discount_fraction
-    
-    return round(base_price * (1 - discount_pct / 100), 2)
+    return pricing.ticket_price(config, accepted_invites)
 
 @tickets_bp.route('/verify', methods=['POST'])
 @require_role(['ticket-inspector', 'admin', 'security', 'bartender'])
+@query_budget(10)
 def verify_ticket():
     user = request.user
     data = request.get_json() or {}
     qr_code = data.get('qr_code')
     
-    if not qr_code:
+    if not qr_code or not isinstance(qr_code, str):
         return jsonify({'error': 'QR code required'}), 400
     
-    ticket = Ticket.query.filter_by(qr_code=qr_code).first()
-    if not ticket:
+    signed = ticket_signing.is_signed(qr_code)
+    if signed:
+        # checked against the signature alone; the database is only touched to record the scan
+        entry, problem = ticket_signing.verify(qr_code)
+        if problem == ticket_signing.REVOKED:
+            return jsonify({
+                'status': 'revoked',
+                'message': 'Ticket revoked',
+                'color': 'red'
+            }), 403
+    else:
+        entry = ticket_index.lookup(qr_code)
+    if not entry:
         return jsonify({
             'status': 'invalid',
             'message': 'Ticket not found',
             'color': 'red'
         }), 404
     
-    ticket_user = ticket.user
-    is_special = ticket_user.role in ['security', 'admin', 'staff']
-    
-    invite_count = Invitation.query.filter_by(inviter_id=ticket_user.id, status='accepted').count()
-    
-    bar_discount = 0.0
-    
-    preset = PresetDiscount.query.filter_by(user_id=ticket_user.id).first()
-    if preset:
-        bar_discount = float(preset.discount_percent)
-    else:
-        invite_discounts = InviteDiscount.query.order_by(InviteDiscount.invite_count.desc()).all()
-        for disc in invite_discounts:
-            if invite_count >= disc.invite_count:
-                bar_discount = float(disc.discount_percent)
-                break
-    
+    is_special = entry['role'] in ['security', 'admin', 'staff']
     ticket_price = 0.0
     payment_status = 'free'
     
-    if ticket_user.role == 'user':
-        ticket_price = calculate_ticket_price(ticket_user.id)
-        if ticket.verified:
+    if entry['role'] == 'user':
+        ticket_price = entry['ticket_price']
+        if entry['verified']:
             payment_status = 'paid'
             color = 'green'
         else:
@@ -99,46 +101,104 @@ def verify_ticket():
         color = 'green'
         payment_status = 'staff'
     
-    if ticket.verified:
-        return jsonify({
-            'status': 'already_verified',
-            'username': ticket_user.username,
-            'user_id': ticket_user.id,
-            'role': ticket_user.role,
-            'is_special': is_special,
-            'verified_at': ticket.verified_at.isoformat() if ticket.verified_at else None,
-            'ticket_price': ticket_price,
-            'payment_status': payment_status,
-            'color': color,
-            'invites': invite_count,
-            'bar_discount': bar_discount
-        })
-    
-    ticket.verified = True
-    ticket.verified_at = datetime.utcnow()
-    ticket.verified_by = user.id
-    db.session.commit()
+    if not entry['verified']:
+        verified_at = datetime.utcnow()
+        claimed = Ticket.query.filter_by(id=entry['ticket_id'], verified=False).update({
+            'verified': True,
+            'verified_at': verified_at,
+            'verified_by': user.id,
+            'verified_offline': False,
+            'change_seq': ticket_sync.next_change()
+        }, synchronize_session=False)
+        db.session.commit()
+        
+        if claimed:
+            ticket_index.mark_verified(qr_code, verified_at)
+            cache.delete('admin:inspector-payments')
+            return jsonify({
+                'status': 'verified',
+                'username': entry['username'],
+                'user_id': entry['user_id'],
+                'role': entry['role'],
+                'is_special': is_special,
+                'verified_at': verified_at.isoformat(),
+                'ticket_price': ticket_price,
+                'payment_status': payment_status,
+                'color': color,
+                'verified_by': user.username,
+                'invites': entry['invites'],
+                'bar_discount': entry['bar_discount']
+            })
+        
+        # another worker verified this ticket since our index saw it
+        if signed:
+            recorded = db.session.query(Ticket.verified_at).filter_by(id=entry['ticket_id']).first()
+            if not recorded:
+                return jsonify({
+                    'status': 'invalid',
+                    'message': 'Ticket not found',
+                    'color': 'red'
+                }), 404
+            entry = dict(entry, verified=True, verified_at=recorded.verified_at)
+        else:
+            entry = ticket_index.reload_ticket(qr_code)
+        if entry['role'] == 'user':
+            payment_status = 'paid'
+            color = 'green'
     
     return jsonify({
-        'status': 'verified',
-        'username': ticket_user.username,
-        'user_id': ticket_user.id,
-        'role': ticket_user.role,
+        'status': 'already_verified',
+        'username': entry['username'],
+        'user_id': entry['user_id'],
+        'role': entry['role'],
         'is_special': is_special,
-        'verified_at': ticket.verified_at.isoformat(),
+        'verified_at': entry['verified_at'].isoformat() if entry['verified_at'] else None,
         'ticket_price': ticket_price,
         'payment_status': payment_status,
         'color': color,
-        'verified_by': user.username,
-        'invites': invite_count,
-        'bar_discount': bar_discount
+        'invites': entry['invites'],
+        'bar_discount': entry['bar_discount']
     })
 
+@tickets_bp.route('/sync', methods=['GET'])
+@require_role(['ticket-inspector', 'admin'])
+@query_budget(10)
+def sync_tickets():
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', ticket_sync.DEFAULT_LIMIT, type=int), ticket_sync.MAX_LIMIT)
+    return jsonify(ticket_sync.changes(since, max(limit, 1)))
+
+@tickets_bp.route('/sync', methods=['POST'])
+@require_role(['ticket-inspector', 'admin', 'security', 'bartender'])
+@query_budget(10)
+def upload_scans():
+    data = request.get_json() or {}
+    scans = data.get('scans')
+    
+    if not isinstance(scans, list):
+        return jsonify({'error': 'scans must be a list'}), 400
+    if len(scans) > ticket_sync.MAX_SCANS:
+        return jsonify({'error': f'At most {ticket_sync.MAX_SCANS} scans per batch'}), 400
+    
+    results, changed = ticket_sync.record_scans(scans, request.user.id)
+    if changed:
+        cache.delete('admin:inspector-payments')
+    
+    return jsonify({'results': results})
+
 @tickets_bp.route('/all', methods=['GET'])
 @require_role(['admin'])
+@query_budget(3)
 def get_all_tickets():
-    tickets = Ticket.query.all()
-    return jsonify([t.to_dict() for t in tickets])
+    view = serializers.TICKETS
+    query = pagination.filter_query(
+        view.query(), status=Ticket.status, username=view.column('username'), created=Ticket.created_at
+    )
+    if request.args.get('verified') in ('true', 'false'):
+        query = query.filter(Ticket.verified == (request.args['verified'] == 'true'))
+    if pagination.requested():
+        return jsonify(pagination.paginate(query, Ticket.created_at, Ticket.id, view.serialize_all, many=True))
+    return jsonify(view.all(query))
 @tickets_bp.route('/confirm-payment', methods=['POST'])
 @require_role(['ticket-inspector', 'admin', 'security'])
 def confirm_payment():
@@ -158,8 +218,13 @@ def confirm_payment():
         ticket.verified = True
         ticket.verified_at = datetime.utcnow()
         ticket.verified_by = user.id
+        ticket.verified_offline = False
+        ticket.change_seq = ticket_sync.next_change()
     
     db.session.commit()
+    if paid:
+        ticket_index.mark_verified(qr_code, ticket.verified_at)
+        cache.delete('admin:inspector-payments')
     
     return jsonify({
         'status': 'success',
@@ -0,0 +1,131 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import func
+from app import db
+from app.models import User, BarTransaction, BarPayout, BartenderBalance
+
+# Sales and payouts adjust the per-bartender ledger row inside the caller's
+# transaction, so balances never need to scan bar_transactions/bar_payouts.
+
+ledger = BartenderBalance.__table__
+
+def _insert():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(ledger)
+
+def _apply(bartender_id, sales, payouts):
+    now = datetime.utcnow()
+    stmt = _insert()
+    if stmt is None:
+        updated = db.session.execute(
+            ledger.update()
+            .where(ledger.c.bartender_id == bartender_id)
+            .values(
+                total_sales=ledger.c.total_sales + sales,
+                total_payouts=ledger.c.total_payouts + payouts,
+                updated_at=now
+            )
+        ).rowcount
+        if not updated:
+            db.session.execute(ledger.insert().values(
+                bartender_id=bartender_id, total_sales=sales, total_payouts=payouts, updated_at=now
+            ))
+        return
+    stmt = stmt.values(bartender_id=bartender_id, total_sales=sales, total_payouts=payouts, updated_at=now)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[ledger.c.bartender_id],
+        set_={
+            'total_sales': ledger.c.total_sales + stmt.excluded.total_sales,
+            'total_payouts': ledger.c.total_payouts + stmt.excluded.total_payouts,
+            'updated_at': now,
+        }
+    ))
+
+def record_sale(bartender_id, amount):
+    _apply(bartender_id, Decimal(str(amount)), Decimal('0'))
+
+def record_payout(bartender_id, amount):
+    """Book a payout only if it fits the outstanding balance; returns False otherwise"""
+    amount = Decimal(str(amount))
+    updated = db.session.execute(
+        ledger.update()
+        .where(
+            ledger.c.bartender_id == bartender_id,
+            ledger.c.total_sales - ledger.c.total_payouts >= amount
+        )
+        .values(total_payouts=ledger.c.total_payouts + amount, updated_at=datetime.utcnow())
+    ).rowcount
+    return updated == 1
+
+def balances():
+    rows = db.session.query(
+        User.id, User.username, ledger.c.total_sales, ledger.c.total_payouts
+    ).outerjoin(ledger, ledger.c.bartender_id == User.id).filter(User.role == 'bartender').all()
+    result = []
+    for bartender_id, username, total_sales, total_payouts in rows:
+        total_sales = float(total_sales or 0)
+        total_payouts = float(total_payouts or 0)
+        result.append({
+            'bartender_id': bartender_id,
+            'bartender_name': username,
+            'total_sales': total_sales,
+            'total_payouts': total_payouts,
+            'outstanding': total_sales - total_payouts
+        })
+    return result
+
+def reconcile(fix=False):
+    """Rebuild the ledger from raw history and report every row that drifted"""
+    if fix and db.session.get_bind().dialect.name == 'postgresql':
+        # sales and payouts write the ledger in their own transaction, so this waits
+        # for the ones in flight and holds back new ones until the rewrite commits;
+        # otherwise one landing between the sums and the rewrite would be lost
+        db.session.execute(db.text('LOCK TABLE bartender_balances IN SHARE ROW EXCLUSIVE MODE'))
+    sales = dict(
+        db.session.query(BarTransaction.bartender_id, func.sum(BarTransaction.actual_amount))
+        .group_by(BarTransaction.bartender_id)
+    )
+    payouts = dict(
+        db.session.query(BarPayout.bartender_id, func.sum(BarPayout.amount))
+        .group_by(BarPayout.bartender_id)
+    )
+    recorded = {
+        row.bartender_id: (row.total_sales, row.total_payouts)
+        for row in db.session.execute(ledger.select())
+    }
+
+    drift = []
+    for bartender_id in sorted(set(sales) | set(payouts) | set(recorded)):
+        expected = (Decimal(sales.get(bartender_id) or 0), Decimal(payouts.get(bartender_id) or 0))
+        actual = tuple(Decimal(v or 0) for v in recorded.get(bartender_id, (0, 0)))
+        if expected == actual:
+            continue
+        drift.append({
+            'bartender_id': bartender_id,
+            'expected_sales': float(expected[0]),
+            'recorded_sales': float(actual[0]),
+            'expected_payouts': float(expected[1]),
+            'recorded_payouts': float(actual[1]),
+        })
+        if fix:
+            if bartender_id in recorded:
+                db.session.execute(
+                    ledger.update()
+                    .where(ledger.c.bartender_id == bartender_id)
+                    .values(total_sales=expected[0], total_payouts=expected[1], updated_at=datetime.utcnow())
+                )
+            else:
+                db.session.execute(ledger.insert().values(
+                    bartender_id=bartender_id, total_sales=expected[0], total_payouts=expected[1],
+                    updated_at=datetime.utcnow()
+                ))
+
+    if fix:
+        db.session.commit()
+    return drift
@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
+from flask import current_app
+from sqlalchemy import func, update
+from app import db
+from app.models import User, BotMessage
+from app.services import cache, jobs
+from app.services.instagram_bot import InstagramBot
+
+BROADCAST_WORKERS = int(os.getenv('BROADCAST_WORKERS', 8))
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', 20))
+BROADCAST_MAX_RETRIES = int(os.getenv('BROADCAST_MAX_RETRIES', 3))
+BROADCAST_BACKOFF = float(os.getenv('BROADCAST_BACKOFF', 1.0))
+STATUS_FLUSH_SIZE = 100
+# how often each worker looks for broadcasts whose runner went away
+RECOVERY_INTERVAL = float(os.getenv('BROADCAST_RECOVERY_INTERVAL', jobs.STALE_AFTER))
+
+class RateLimiter:
+    """Token bucket shared by all sender threads"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(1.0, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class BroadcastEngine:
+    """Sends one message to many users from a bounded worker pool.
+
+    Every recipient gets a BotMessage row tagged with the job id, so progress
+    can be reported from any worker and an interrupted job resumes with the
+    recipients that are still pending or failed. A runner claims recipients
+    by moving them to 'sending' before it sends, so two runners never message
+    the same person.
+    """
+
+    def __init__(self, bot=None, workers=BROADCAST_WORKERS, rate=BROADCAST_RATE,
+                 max_retries=BROADCAST_MAX_RETRIES, backoff=BROADCAST_BACKOFF):
+        self.bot = bot or InstagramBot(pool_size=workers)
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def create_job(self, content):
+        job_id = uuid.uuid4().hex
+        recipients = db.session.query(User.id).filter_by(is_banned=False).all()
+        db.session.execute(BotMessage.__table__.insert(), [{
+            'message_type': 'broadcast',
+            'content': content,
+            'sent_to_user_id': user_id,
+            'status': 'pending',
+            'job_id': job_id,
+            'attempts': 0,
+            'sent_at': None,
+        } for (user_id,) in recipients])
+        db.session.commit()
+        return job_id
+
+    def start(self, job_id):
+        return jobs.start('broadcast', self.run, job_id=job_id)
+
+    def resume(self, job_id):
+        if jobs.is_running(job_id):
+            return None
+        # the runner that claimed these is gone (its heartbeat stopped)
+        db.session.execute(
+            update(BotMessage).where(BotMessage.job_id == job_id, BotMessage.status == 'sending')
+            .values(status='pending')
+        )
+        db.session.commit()
+        return self.start(job_id)
+
+    def _send(self, username, content):
+        attempt = 0
+        while True:
+            attempt += 1
+            self.limiter.acquire()
+            retryable = True
+            try:
+                response = self.bot.post_message(username, content)
+                if response is None:
+                    return 'failed', attempt
+                if response.status_code == 200:
+                    return 'sent', attempt
+                retryable = response.status_code == 429 or response.status_code >= 500
+            except requests.RequestException:
+                pass
+            if not retryable or attempt > self.max_retries:
+                return 'failed', attempt
+            time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def _flush(self, results):
+        if results:
+            db.session.execute(update(BotMessage), results)
+            db.session.commit()
+            results.clear()
+
+    def _claim(self, ids):
+        claimed = db.session.execute(
+            update(BotMessage)
+            .where(BotMessage.id.in_(ids), BotMessage.status.in_(['pending', 'failed']))
+            .values(status='sending')
+            .returning(BotMessage.id)
+        ).scalars().all()
+        rows = db.session.query(BotMessage.id, BotMessage.content, BotMessage.attempts, User.username).join(
+            User, BotMessage.sent_to_user_id == User.id
+        ).filter(BotMessage.id.in_(claimed)).all() if claimed else []
+        db.session.commit()
+        return rows
+
+    def run(self, job_id):
+        ids = [message_id for (message_id,) in db.session.query(BotMessage.id).filter(
+            BotMessage.job_id == job_id,
+            BotMessage.status.in_(['pending', 'failed'])
+        ).order_by(BotMessage.id)]
+        db.session.commit()
+
+        total = len(ids)
+        done = 0
+        results = []
+        jobs.update(job_id, total=total, done=0)
+
+        def deliver(row):
+            status, attempts = self._send(row.username, row.content)
+            return row, status, attempts
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for start in range(0, total, STATUS_FLUSH_SIZE):
+                if jobs.stopping(job_id):
+                    # the worker is being recycled; the rest stays pending for resume_abandoned
+                    break
+                chunk = ids[start:start + STATUS_FLUSH_SIZE]
+                # recipients another runner already took are skipped
+                for row, status, attempts in pool.map(deliver, self._claim(chunk)):
+                    results.append({
+                        'id': row.id,
+                        'status': status,
+                        'attempts': (row.attempts or 0) + attempts,
+                        'sent_at': datetime.utcnow() if status == 'sent' else None,
+                    })
+                self._flush(results)
+                done += len(chunk)
+                jobs.update(job_id, done=done)
+
+        return self.status(job_id)['counts']
+
+    def status(self, job_id):
+        counts = dict(
+            db.session.query(BotMessage.status, func.count(BotMessage.id))
+            .filter(BotMessage.job_id == job_id)
+            .group_by(BotMessage.status)
+        )
+        job = jobs.get(job_id) or {}
+        return {
+            'job_id': job_id,
+            'state': job.get('state', 'unknown' if counts else 'missing'),
+            'total': sum(counts.values()),
+            'counts': counts,
+        }
+
+def resume_abandoned(bot=None):
+    """Resume every broadcast with unsent recipients whose runner is gone; returns their job ids"""
+    job_ids = [job_id for (job_id,) in db.session.query(BotMessage.job_id).filter(
+        BotMessage.job_id.isnot(None),
+        BotMessage.status.in_(['pending', 'sending'])
+    ).distinct()]
+    db.session.commit()
+
+    resumed = []
+    for job_id in job_ids:
+        # one worker takes each job; the others see it running once it restarts
+        if not jobs.abandoned(job_id) or not cache.add(f'broadcast:resume:{job_id}', 1, ttl=jobs.STALE_AFTER):
+            continue
+        if BroadcastEngine(bot=bot).resume(job_id):
+            current_app.logger.info('Resumed broadcast %s', job_id)
+            resumed.append(job_id)
+    return resumed
+
+def watch(app, bot=None, interval=RECOVERY_INTERVAL):
+    """Check for abandoned broadcasts now and every interval seconds, from a daemon thread"""
+    def loop():
+        while True:
+            with app.app_context():
+                try:
+                    resume_abandoned(bot)
+                except Exception:
+                    current_app.logger.exception('Broadcast recovery failed')
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name='broadcast-recovery', daemon=True).start()
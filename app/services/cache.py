@@ -1,48 +1,266 @@
-import redis
 import json
 import os
-
-redis_client = redis.Redis(
-    host=os.getenv('REDIS_HOST', 'localhost'),
-    port=int(os.getenv('REDIS_PORT', 6379)),
-    decode_responses=True
-)
+import threading
+import time
+from collections import OrderedDict
 
 CACHE_TTL = 60
 USER_CACHE_TTL = 300
 
-def get(key):
+# Two tiers: a small per-process LRU in front of Redis. Local entries live at
+# most LOCAL_TTL seconds so writes from other workers show up quickly. When
+# Redis keeps failing, the breaker skips it for a cooldown instead of making
+# every request wait for a socket timeout.
+LOCAL_MAX_ITEMS = int(os.getenv('CACHE_LOCAL_MAX_ITEMS', 1024))
+LOCAL_TTL = float(os.getenv('CACHE_LOCAL_TTL', 5))
+BREAKER_THRESHOLD = int(os.getenv('REDIS_BREAKER_THRESHOLD', 3))
+BREAKER_COOLDOWN = float(os.getenv('REDIS_BREAKER_COOLDOWN', 10))
+# Deletes that can't reach Redis are queued and replayed once it answers again,
+# so an invalidation made during an outage doesn't leave a stale entry behind
+# for its full TTL. Past the cap, the oldest queued keys just wait out their TTL.
+PENDING_DELETES_MAX = int(os.getenv('CACHE_PENDING_DELETES_MAX', 10000))
+
+# redis-py is imported and the pool built on first use, keeping it out of worker boot
+redis = None
+redis_pool = None
+redis_client = None
+_connect_lock = threading.Lock()
+
+def client():
+    global redis, redis_pool, redis_client
+    if redis_client is None:
+        with _connect_lock:
+            if redis_client is None:
+                import redis as redis_module
+                redis_pool = redis_module.ConnectionPool(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', 50)),
+                    socket_timeout=float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.25)),
+                    socket_connect_timeout=float(os.getenv('REDIS_CONNECT_TIMEOUT', 0.25)),
+                    decode_responses=True
+                )
+                redis = redis_module
+                redis_client = redis_module.Redis(connection_pool=redis_pool)
+    return redis_client
+
+class TierStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, started, hit=None, error=False):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.calls += 1
+            self.total_ms += elapsed
+            self.max_ms = max(self.max_ms, elapsed)
+            if error:
+                self.errors += 1
+            elif hit is True:
+                self.hits += 1
+            elif hit is False:
+                self.misses += 1
+
+    def to_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'avg_latency_ms': round(self.total_ms / self.calls, 3) if self.calls else None,
+                'max_latency_ms': round(self.max_ms, 3),
+            }
+
+class LocalCache:
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, raw = item
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return raw
+
+    def set(self, key, raw, ttl):
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, raw)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def add(self, key, raw, ttl):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] > time.monotonic():
+                return False
+            self._items[key] = (time.monotonic() + ttl, raw)
+            self._items.move_to_end(key)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self):
+        return len(self._items)
+
+class CircuitBreaker:
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            # after the cooldown one call is let through to probe Redis
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        return 'closed' if self.opened_at is None else 'open'
+
+local_cache = LocalCache(LOCAL_MAX_ITEMS)
+breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+stats = {'local': TierStats(), 'redis': TierStats()}
+# insertion-ordered, so the cap drops the oldest
+_pending_deletes = OrderedDict()
+_pending_lock = threading.Lock()
+
+def _queue_delete(key):
+    with _pending_lock:
+        _pending_deletes[key] = None
+        _pending_deletes.move_to_end(key)
+        while len(_pending_deletes) > PENDING_DELETES_MAX:
+            _pending_deletes.popitem(last=False)
+
+def _replay_deletes():
+    with _pending_lock:
+        keys = list(_pending_deletes)
+        _pending_deletes.clear()
+    if not keys:
+        return
     try:
-        if redis_client.ping():
-            cached = redis_client.get(key)
-            if cached:
-                return json.loads(cached)
-    except:
-        pass
-    return None
+        client().delete(*keys)
+    except redis.RedisError:
+        for key in keys:
+            _queue_delete(key)
+        raise
 
-def set(key, value, ttl=CACHE_TTL):
+def get_redis():
+    """Redis client for callers that need native commands, or None while the breaker is open"""
+    return client() if breaker.allow() else None
+
+def _redis_call(command, *args, **kwargs):
+    if not breaker.allow():
+        return None, False
+    fn = getattr(client(), command)
+    started = time.perf_counter()
     try:
-        if redis_client.ping():
-            redis_client.setex(key, ttl, json.dumps(value, default=str))
-    except:
-        pass
+        # before the command, so a read right after an outage can't see a stale entry
+        if _pending_deletes:
+            _replay_deletes()
+        result = fn(*args, **kwargs)
+    except redis.RedisError:
+        breaker.failure()
+        stats['redis'].record(started, error=True)
+        return None, False
+    breaker.success()
+    return result, started
+
+def get(key):
+    started = time.perf_counter()
+    raw = local_cache.get(key)
+    stats['local'].record(started, hit=raw is not None)
+    if raw is not None:
+        return json.loads(raw)
+
+    raw, started = _redis_call('get', key)
+    if started:
+        stats['redis'].record(started, hit=raw is not None)
+    if raw is None:
+        return None
+    local_cache.set(key, raw, LOCAL_TTL)
+    return json.loads(raw)
+
+def set(key, value, ttl=CACHE_TTL):
+    raw = json.dumps(value, default=str)
+    local_cache.set(key, raw, min(ttl, LOCAL_TTL))
+    _, started = _redis_call('set', key, raw, ex=ttl)
+    if started:
+        stats['redis'].record(started)
+
+def add(key, value, ttl=CACHE_TTL):
+    """Set key only if nobody holds it; True when this call took it. Per worker while Redis is down"""
+    raw = json.dumps(value, default=str)
+    taken, started = _redis_call('set', key, raw, ex=ttl, nx=True)
+    if not started:
+        return local_cache.add(key, raw, ttl)
+    stats['redis'].record(started)
+    if taken:
+        local_cache.set(key, raw, min(ttl, LOCAL_TTL))
+    return bool(taken)
 
 def delete(key):
-    try:
-        if redis_client.ping():
-            redis_client.delete(key)
-    except:
-        pass
+    local_cache.delete(key)
+    _, started = _redis_call('delete', key)
+    if started:
+        stats['redis'].record(started)
+    else:
+        _queue_delete(key)
 
 def get_cache_status():
-    try:
-        if redis_client.ping():
-            info = redis_client.info()
-            return {
-                'status': 'connected',
-                'memory_used_mb': info.get('used_memory', 0) / (1024 * 1024),
-                'connected_clients': info.get('connected_clients', 0),
-            }
-    except:
-        return {'status': 'disconnected'}
+    client()
+    status = {
+        'status': 'disconnected',
+        'breaker': breaker.state,
+        'local_items': len(local_cache),
+        'pending_deletes': len(_pending_deletes),
+        'tiers': {name: tier.to_dict() for name, tier in stats.items()},
+        'pool': {
+            'max_connections': redis_pool.max_connections,
+            'in_use': len(redis_pool._in_use_connections),
+            'idle': len(redis_pool._available_connections),
+        },
+    }
+    info, started = _redis_call('info')
+    if info:
+        status.update({
+            'status': 'connected',
+            'memory_used_mb': info.get('used_memory', 0) / (1024 * 1024),
+            'connected_clients': info.get('connected_clients', 0),
+        })
+    return status
@@ -0,0 +1,78 @@
+import hashlib
+from sqlalchemy import func, select
+from app import db
+
+# Each admin dashboard section is stamped with a digest of cheap aggregates
+# over the tables it is built from. All stamps come from one SELECT, so a
+# poll that finds nothing changed costs a single round trip.
+
+def _table_stamps():
+    from app.models import (
+        User, Invitation, EventConfig, RoleSalary, Ticket, ManagerCall, SecurityJob,
+        BarItem, InviteDiscount, PresetDiscount, BarInventory, BarTransaction, BarPayout,
+        security_job_assignments
+    )
+    return {
+        'users': [func.count(User.id), func.max(User.updated_at)],
+        'invitations': [func.count(Invitation.id), func.max(Invitation.id), func.max(Invitation.accepted_at)],
+        'event_config': [func.count(EventConfig.id), func.max(EventConfig.updated_at)],
+        'role_salaries': [func.count(RoleSalary.id), func.max(RoleSalary.updated_at)],
+        'tickets': [func.count(Ticket.id), func.max(Ticket.updated_at)],
+        'manager_calls': [func.count(ManagerCall.id), func.max(ManagerCall.id), func.max(ManagerCall.resolved_at)],
+        'security_jobs': [func.count(SecurityJob.id), func.max(SecurityJob.id), func.max(SecurityJob.updated_at)],
+        'security_job_assignments': [
+            func.count(security_job_assignments.c.job_id),
+            func.sum(security_job_assignments.c.job_id),
+            func.sum(security_job_assignments.c.user_id),
+        ],
+        'bar_items': [func.count(BarItem.id), func.max(BarItem.id), func.max(BarItem.updated_at)],
+        'invite_discounts': [func.count(InviteDiscount.id), func.max(InviteDiscount.id), func.max(InviteDiscount.updated_at)],
+        'preset_discounts': [func.count(PresetDiscount.id), func.max(PresetDiscount.id)],
+        'bar_inventory': [func.count(BarInventory.id), func.max(BarInventory.id), func.max(BarInventory.last_updated)],
+        'bar_transactions': [func.max(BarTransaction.id)],
+        'bar_payouts': [func.max(BarPayout.id)],
+    }
+
+SECTION_TABLES = {
+    'users': ['users'],
+    'invitations': ['invitations', 'users'],
+    'config': ['event_config'],
+    'salaries': ['role_salaries'],
+    'inspector_payments': ['tickets', 'users', 'invitations', 'event_config'],
+    'manager_calls': ['manager_calls', 'users'],
+    'security_jobs': ['security_jobs', 'security_job_assignments'],
+    'bar_items': ['bar_items'],
+    'invite_discounts': ['invite_discounts'],
+    'preset_discounts': ['preset_discounts', 'users'],
+    'inventory': ['bar_inventory', 'bar_items'],
+    'bartender_balances': ['bar_transactions', 'bar_payouts', 'users'],
+}
+
+SECTIONS = list(SECTION_TABLES)
+
+def section_versions():
+    stamps = _table_stamps()
+    columns = []
+    layout = []
+    for table, aggregates in stamps.items():
+        for index, aggregate in enumerate(aggregates):
+            columns.append(select(aggregate).scalar_subquery().label(f'{table}_{index}'))
+            layout.append(table)
+    row = db.session.query(*columns).one()
+    values = {}
+    for table, value in zip(layout, row):
+        values.setdefault(table, []).append(value)
+    versions = {}
+    for section, tables in SECTION_TABLES.items():
+        raw = repr([values[t] for t in tables]).encode()
+        versions[section] = hashlib.md5(raw).hexdigest()[:8]
+    return versions
+
+def encode_version(versions):
+    return '.'.join(versions[s] for s in SECTIONS)
+
+def decode_version(token):
+    parts = (token or '').split('.')
+    if len(parts) != len(SECTIONS):
+        return {}
+    return dict(zip(SECTIONS, parts))
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Engine settings come from the environment. DATABASE_URL wins over the DB_*
+# parts and may point at SQLite for embedded benchmark runs.
+
+DRIVERS = ('pg8000', 'psycopg2', 'psycopg')
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.connects = 0
+            self.connect_ms = 0.0
+
+    def record_checkout(self, elapsed_ms, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_ms += elapsed_ms
+            self.max_wait_ms = max(self.max_wait_ms, elapsed_ms)
+
+    def record_connect(self, elapsed_ms):
+        with self._lock:
+            self.connects += 1
+            self.connect_ms += elapsed_ms
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.wait_ms / self.checkouts, 3) if self.checkouts else None,
+                'max_wait_ms': round(self.max_wait_ms, 3),
+                'connects': self.connects,
+                'avg_connect_ms': round(self.connect_ms / self.connects, 3) if self.connects else None,
+            }
+
+pool_stats = PoolStats()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait and how often new connections are opened"""
+
+    def connect(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_stats.record_checkout((time.perf_counter() - started) * 1000, timed_out)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            pool_stats.record_connect((time.perf_counter() - started) * 1000)
+
+def _env_bool(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+def database_uri():
+    driver = os.getenv('DB_DRIVER', 'pg8000').lower()
+    if driver not in DRIVERS:
+        raise ValueError(f'DB_DRIVER must be one of {", ".join(DRIVERS)}')
+    
+    url = os.getenv('DATABASE_URL')
+    if url:
+        # hosting providers hand out postgres:// URLs without a driver
+        if url.startswith('postgres://'):
+            url = 'postgresql://' + url[len('postgres://'):]
+        if url.startswith('postgresql://'):
+            url = f'postgresql+{driver}://' + url[len('postgresql://'):]
+        return url
+    
+    db_user = os.getenv('DB_USER', 'eventuser')
+    db_password = os.getenv('DB_PASSWORD', 'eventpass')
+    db_host = os.getenv('DB_HOST', 'localhost')
+    db_port = os.getenv('DB_PORT', '5432')
+    db_name = os.getenv('DB_NAME', 'eventpyramide')
+    return f"postgresql+{driver}://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+def engine_options(uri):
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # in-memory SQLite lives on a single connection; keep SQLAlchemy's default pool
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', 'true'),
+    }
+
+def statement_timeout_ms():
+    return int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+
+def configure_engine(engine):
+    """Per-connection settings that can't go through engine options"""
+    timeout = statement_timeout_ms()
+    if engine.dialect.name != 'postgresql' or timeout <= 0:
+        return
+    
+    @event.listens_for(engine, 'connect')
+    def set_statement_timeout(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'SET statement_timeout = {timeout}')
+        cursor.close()
+        # outside autocommit the SET would be undone by the pool's rollback on checkin
+        dbapi_connection.commit()
+
+def status(engine):
+    pool = engine.pool
+    result = {
+        'dialect': engine.dialect.name,
+        'driver': engine.dialect.driver,
+        'pool_class': type(pool).__name__,
+        'statement_timeout_ms': statement_timeout_ms() if engine.dialect.name == 'postgresql' else None,
+    }
+    if isinstance(pool, QueuePool):
+        result['pool'] = {
+            'size': pool.size(),
+            'in_use': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+            **pool_stats.to_dict(),
+        }
+    return result
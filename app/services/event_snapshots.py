@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from app.services import cache
+from app.services.http_cache import digest
+
+# The public event info only changes when an admin edits the config or a
+# release_date_* passes, so every phase is rendered up front: one JSON body
+# and ETag per interval between release timestamps. The set is stored in the
+# cache under 'event:config' whenever the config changes; each worker keeps
+# a pointer to the phase in effect and a timer moves it at the next release,
+# so a request during the reveal is a pointer read and never a query.
+
+SNAPSHOT_KEY = 'event:config'
+SNAPSHOT_TTL = 86400
+SYNC_INTERVAL = float(os.getenv('EVENT_SNAPSHOT_SYNC_INTERVAL', 2))
+
+_lock = threading.RLock()
+_record = None
+_current = None
+_timer = None
+_synced_at = 0.0
+
+def _timestamp(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def event_info_payload(config, now):
+    if not config:
+        return {
+            'available': False,
+            'message': 'Event information is not yet public'
+        }
+
+    info = {'available': True}
+
+    if config.event_date_public and (not config.release_date_event_date or now >= config.release_date_event_date):
+        info['event_date'] = config.event_date.isoformat() if config.event_date else None
+
+    if config.event_place_public and (not config.release_date_event_place or now >= config.release_date_event_place):
+        info['event_place'] = config.event_place
+        info['event_place_lat'] = float(config.event_place_lat) if config.event_place_lat else None
+        info['event_place_lng'] = float(config.event_place_lng) if config.event_place_lng else None
+
+    if config.participants_public and (not config.release_date_participants or now >= config.release_date_participants):
+        info['current_participants'] = config.current_participants
+        info['max_participants'] = config.max_participants
+
+    base_price = float(config.ticket_price) if config.ticket_price is not None else None
+    max_disc = float(config.max_discount_percent) if config.max_discount_percent is not None else 0.0
+    info['max_ticket_price'] = base_price
+    info['min_ticket_price'] = round(base_price * (1 - max_disc / 100), 2) if base_price is not None else None
+    info['currency'] = config.currency
+    info['max_invites_per_user'] = config.max_invites_per_user
+    info['max_discount_percent'] = float(config.max_discount_percent) if config.max_discount_percent is not None else None
+    info['ticket_qr_enabled'] = config.ticket_qr_enabled
+
+    return info
+
+def _materialize():
+    from app.models import EventConfig
+    config = EventConfig.query.first()
+    releases = []
+    if config:
+        releases = sorted({
+            value for value in (
+                config.release_date_participants, config.release_date_event_date, config.release_date_event_place
+            ) if value
+        })
+
+    phases = []
+    for starts in [None] + releases:
+        # a phase sees every release up to and including its own start
+        body = current_app.json.dumps(event_info_payload(config, starts or datetime.min))
+        if phases and phases[-1]['body'] == body:
+            continue
+        phases.append({
+            'starts_at': _timestamp(starts) if starts else None,
+            'etag': f'event-info-{digest(body)}',
+            'body': body,
+        })
+    for phase, following in zip(phases, phases[1:] + [None]):
+        phase['ends_at'] = following['starts_at'] if following else None
+    return {'version': digest(*(phase['etag'] for phase in phases)), 'phases': phases}
+
+def _advance():
+    """Point at the phase in effect now and schedule the next swap"""
+    global _current, _timer
+    with _lock:
+        now = time.time()
+        phases = _record['phases']
+        _current = next(
+            phase for phase in reversed(phases)
+            if phase['starts_at'] is None or phase['starts_at'] <= now
+        )
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        if _current['ends_at'] is not None:
+            _timer = threading.Timer(max(_current['ends_at'] - now, 0), _advance)
+            _timer.daemon = True
+            _timer.start()
+
+def _install(record):
+    global _record
+    with _lock:
+        if _record is not None and _record['version'] == record['version']:
+            return
+        _record = record
+        _advance()
+
+def _sync():
+    global _synced_at
+    with _lock:
+        _synced_at = time.monotonic()
+        record = cache.get(SNAPSHOT_KEY)
+        if record is None:
+            record = _materialize()
+            cache.set(SNAPSHOT_KEY, record, ttl=SNAPSHOT_TTL)
+        _install(record)
+
+def publish():
+    """Re-render every phase after the event config changes"""
+    record = _materialize()
+    cache.set(SNAPSHOT_KEY, record, ttl=SNAPSHOT_TTL)
+    _install(record)
+
+def current():
+    """The phase in effect: {'etag', 'body', 'starts_at', 'ends_at'}"""
+    if _record is None or time.monotonic() - _synced_at >= SYNC_INTERVAL:
+        _sync()
+    snapshot = _current
+    # the timer can fire a little late; the reveal must not
+    if snapshot['ends_at'] is not None and time.time() >= snapshot['ends_at']:
+        _advance()
+        snapshot = _current
+    return snapshot
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from app.services import cache
+
+# Push channel for staff screens. publish() appends to a Redis stream so every
+# worker sees the event; one bridge thread per worker blocks on that stream
+# and fans events out to the worker's open SSE connections through a local
+# ring buffer. Without Redis events stay in the publishing worker's ring.
+# Event ids are stream ids ("<ms>-<seq>"), so a client reconnecting with
+# Last-Event-ID gets exactly what it missed, or a 'reset' when that can no
+# longer be recovered and it should reload.
+
+STREAM_KEY = 'events:stream'
+RING_SIZE = int(os.getenv('EVENT_RING_SIZE', 1000))
+KEEPALIVE_INTERVAL = float(os.getenv('EVENT_KEEPALIVE_INTERVAL', 20))
+STREAM_MAX_AGE = float(os.getenv('EVENT_STREAM_MAX_AGE', 300))
+RECONNECT_MS = 3000
+BRIDGE_BLOCK_MS = 15000
+
+_ring = deque(maxlen=RING_SIZE)
+_cond = threading.Condition()
+_bridge = None
+_bridge_lock = threading.Lock()
+_last_local = (0, 0)
+
+def _key(event_id):
+    try:
+        ms, seq = event_id.split('-')
+        return int(ms), int(seq)
+    except (AttributeError, ValueError):
+        return None
+
+def _entry(event_id, raw):
+    event = json.loads(raw)
+    event['id'] = event_id
+    event['key'] = _key(event_id)
+    return event
+
+def _append(event_id, raw):
+    with _cond:
+        _ring.append(_entry(event_id, raw))
+        _cond.notify_all()
+
+def _local_id():
+    global _last_local
+    ms = int(time.time() * 1000)
+    _last_local = (ms, 0) if ms > _last_local[0] else (_last_local[0], _last_local[1] + 1)
+    return f'{_last_local[0]}-{_last_local[1]}'
+
+def publish(channel, kind, data):
+    """Send {'type': kind, 'data': data} to subscribers of channel"""
+    raw = json.dumps({'channel': channel, 'type': kind, 'data': data}, default=str)
+    client = cache.get_redis()
+    if client is not None:
+        try:
+            client.xadd(STREAM_KEY, {'event': raw}, maxlen=RING_SIZE, approximate=True)
+            return
+        except Exception:
+            cache.breaker.failure()
+    with _cond:
+        _append(_local_id(), raw)
+
+def _bridge_forever(client, last_id):
+    while True:
+        try:
+            batches = client.xread({STREAM_KEY: last_id}, count=100, block=BRIDGE_BLOCK_MS)
+        except Exception:
+            cache.breaker.failure()
+            time.sleep(1)
+            continue
+        for _, entries in batches or ():
+            for event_id, fields in entries:
+                _append(event_id, fields['event'])
+                last_id = event_id
+
+def _ensure_bridge():
+    global _bridge
+    if _bridge is not None or cache.get_redis() is None:
+        return
+    with _bridge_lock:
+        if _bridge is not None:
+            return
+        shared = cache.client()
+        try:
+            newest = shared.xrevrange(STREAM_KEY, count=1)
+        except Exception:
+            cache.breaker.failure()
+            return
+        # blocking reads need their own connection without the cache's short socket timeout
+        kwargs = dict(cache.redis_pool.connection_kwargs, socket_timeout=BRIDGE_BLOCK_MS / 1000 + 5)
+        client = cache.redis.Redis(connection_pool=cache.redis.ConnectionPool(max_connections=1, **kwargs))
+        _bridge = threading.Thread(
+            target=_bridge_forever, args=(client, newest[0][0] if newest else '0-0'),
+            name='events-bridge', daemon=True
+        )
+        _bridge.start()
+
+def _resume(last_event_id):
+    """Events after last_event_id, or None when some of them are gone"""
+    with _cond:
+        ids = [event['id'] for event in _ring]
+        if last_event_id in ids:
+            return list(_ring)[ids.index(last_event_id) + 1:]
+    client = cache.get_redis()
+    if client is None:
+        return None
+    try:
+        entries = client.xrange(STREAM_KEY, min=last_event_id, count=RING_SIZE + 1)
+    except Exception:
+        return None
+    if not entries or entries[0][0] != last_event_id:
+        return None
+    return [_entry(event_id, fields['event']) for event_id, fields in entries[1:]]
+
+def _format(event):
+    data = json.dumps({'type': event['type'], 'data': event['data']}, default=str)
+    event_id = f"id: {event['id']}\n" if event['id'] else ''
+    return f"{event_id}event: {event['channel']}\ndata: {data}\n\n"
+
+def subscribe(channels, last_event_id=None):
+    """SSE lines for events on channels, starting after last_event_id"""
+    _ensure_bridge()
+    with _cond:
+        newest = _ring[-1] if _ring else None
+    cursor = newest['key'] if newest else (0, 0)
+    backlog = []
+    if last_event_id:
+        backlog = _resume(last_event_id)
+        if backlog is None:
+            # the client reloads, then carries on from the newest event we know of
+            backlog = [{'id': newest['id'] if newest else None, 'channel': 'reset', 'type': 'reset', 'data': None}]
+        else:
+            cursor = max([_key(last_event_id)] + [event['key'] for event in backlog])
+
+    def generate():
+        nonlocal cursor
+        yield f'retry: {RECONNECT_MS}\n\n'
+        for event in backlog:
+            if event['channel'] in channels or event['channel'] == 'reset':
+                yield _format(event)
+        deadline = time.monotonic() + STREAM_MAX_AGE
+        while time.monotonic() < deadline:
+            with _cond:
+                pending = [event for event in _ring if event['key'] > cursor]
+                if not pending:
+                    _cond.wait(KEEPALIVE_INTERVAL)
+                    pending = [event for event in _ring if event['key'] > cursor]
+            if not pending:
+                yield ': keepalive\n\n'
+                continue
+            for event in pending:
+                cursor = event['key']
+                if event['channel'] in channels:
+                    yield _format(event)
+
+    return generate()
@@ -0,0 +1,40 @@
+import hashlib
+import os
+from flask import current_app, make_response, request
+from app.services import cache
+
+# Validator-based caching for payloads every client fetches on load. Each
+# resource has a content version kept in the cache under 'version:<name>';
+# writers drop it after committing, and the next read rebuilds it from a
+# digest of cheap aggregates, so a version only changes when the data does.
+# A request whose If-None-Match still matches gets a 304 before the view
+# builds anything.
+
+VERSION_TTL = int(os.getenv('CONTENT_VERSION_TTL', 3600))
+
+def digest(*values):
+    return hashlib.md5(repr(values).encode()).hexdigest()[:16]
+
+def _version_key(name):
+    return f'version:{name}'
+
+def content_version(name, load):
+    """Cached version record for name; load() returns it (a dict with 'version') on a miss"""
+    record = cache.get(_version_key(name))
+    if record is None:
+        record = load()
+        cache.set(_version_key(name), record, ttl=VERSION_TTL)
+    return record
+
+def invalidate(name):
+    cache.delete(_version_key(name))
+
+def conditional(etag, cache_control, build):
+    """304 when the client already holds etag, otherwise the response build() returns"""
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -1,24 +1,48 @@
-import requests
 import os
-from typing import Optional
+import threading
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
 
 class InstagramBot:
-    def __init__(self):
-        self.api_url = os.getenv('INSTAGRAM_API_URL', '')
+    def __init__(self, api_url: Optional[str] = None, pool_size: int = 10):
+        self.api_url = api_url if api_url is not None else os.getenv('INSTAGRAM_API_URL', '')
         self.access_token = os.getenv('INSTAGRAM_ACCESS_TOKEN', '')
+        self.timeout = float(os.getenv('INSTAGRAM_TIMEOUT', 10))
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
     
-    def send_message_by_username(self, username: str, message: str) -> bool:
+    @property
+    def session(self) -> 'requests.Session':
+        # requests is imported on first send, not when the routes are loaded
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+    
+    def post_message(self, username: str, message: str) -> Optional['requests.Response']:
         if not self.api_url or not self.access_token:
-            return False
+            return None
         
+        payload = {
+            'recipient': {'username': username},
+            'message': {'text': message},
+            'access_token': self.access_token
+        }
+        return self.session.post(f'{self.api_url}/messages', json=payload, timeout=self.timeout)
+    
+    def send_message_by_username(self, username: str, message: str) -> bool:
         try:
-            payload = {
-                'recipient': {'username': username},
-                'message': {'text': message},
-                'access_token': self.access_token
-            }
-            response = requests.post(f'{self.api_url}/messages', json=payload)
-            return response.status_code == 200
+            response = self.post_message(username, message)
+            return response is not None and response.status_code == 200
         except Exception as e:
             print(f'Failed to send Instagram message: {str(e)}')
             return False
@@ -32,14 +56,10 @@ class InstagramBot:
         return self.send_message_by_username(user.username, content)
     
     def broadcast_update(self, content: str) -> dict:
-        from app.models import User
-        users = User.query.filter_by(is_banned=False).all()
-        results = {'success': 0, 'failed': 0}
-        
-        for user in users:
-            if self.send_message_by_username(user.username, content):
-                results['success'] += 1
-            else:
-                results['failed'] += 1
-        
-        return results
+        """Synchronous broadcast; the API queues a background job through BroadcastEngine instead"""
+        from app.services.broadcast import BroadcastEngine
+        engine = BroadcastEngine(bot=self)
+        job_id = engine.create_job(content)
+        engine.run(job_id)
+        counts = engine.status(job_id)['counts']
+        return {'success': counts.get('sent', 0), 'failed': counts.get('failed', 0)}
@@ -0,0 +1,53 @@
+from datetime import datetime
+from sqlalchemy import case
+from app import db
+from app.models import BarInventory
+
+ALLOW_OVERSELL = 'allow-oversell'
+CLAMP = 'clamp'
+REJECT = 'reject'
+MODES = (ALLOW_OVERSELL, CLAMP, REJECT)
+
+inventory = BarInventory.__table__
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        super().__init__('Insufficient stock')
+        self.shortages = shortages
+
+def decrement(quantities, mode=CLAMP):
+    """Take {item_id: quantity} out of stock in one UPDATE and return the new levels.
+
+    Items without an inventory row are not tracked and are skipped. In REJECT
+    mode nothing is written when any tracked item is short; the caller's
+    transaction must be rolled back on InsufficientStock.
+    """
+    if not quantities:
+        return {}
+
+    item_ids = list(quantities)
+    requested = case(quantities, value=inventory.c.item_id, else_=0)
+    remaining = inventory.c.quantity - requested
+    if mode == CLAMP:
+        remaining = case((remaining < 0, 0), else_=remaining)
+
+    stmt = inventory.update().where(inventory.c.item_id.in_(item_ids))
+    if mode == REJECT:
+        stmt = stmt.where(inventory.c.quantity >= requested)
+    stmt = stmt.values(quantity=remaining, last_updated=datetime.utcnow())
+    rows = db.session.execute(stmt.returning(inventory.c.item_id, inventory.c.quantity)).all()
+    levels = {item_id: quantity for item_id, quantity in rows}
+
+    if mode == REJECT and len(levels) < len(item_ids):
+        missing = [item_id for item_id in item_ids if item_id not in levels]
+        short = db.session.query(BarInventory.item_id, BarInventory.quantity).filter(
+            BarInventory.item_id.in_(missing)
+        ).all()
+        if short:
+            raise InsufficientStock([{
+                'item_id': item_id,
+                'requested': quantities[item_id],
+                'available': available,
+            } for item_id, available in short])
+
+    return levels
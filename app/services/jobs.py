@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.services import cache
+
+# Minimal background job runner. Jobs run on a daemon thread inside an app
+# context; their state is mirrored to the cache so any worker can report it.
+# A second thread refreshes the heartbeat while the job runs, so a job that is
+# slow between progress updates never looks stale. Gunicorn recycles workers
+# (max_requests), and its worker_exit hook calls stop_all(): jobs that check
+# stopping() wind down between batches and end up 'interrupted', which their
+# owners treat as abandoned and pick up again.
+
+JOB_TTL = 86400
+STALE_AFTER = 60
+HEARTBEAT_INTERVAL = 5
+STOP_TIMEOUT = float(os.getenv('JOB_STOP_TIMEOUT', 10))
+# a lease key outlives a killed worker by at most this long
+LEASE_TTL = 3 * HEARTBEAT_INTERVAL
+
+_jobs = {}
+_running = {}
+_lock = threading.Lock()
+
+def _key(job_id):
+    return f'jobs:{job_id}'
+
+def update(job_id, **fields):
+    with _lock:
+        job = _jobs.setdefault(job_id, {'id': job_id})
+        job.update(fields)
+        job['heartbeat'] = time.time()
+        snapshot = dict(job)
+    cache.set(_key(job_id), snapshot, ttl=JOB_TTL)
+
+def get(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job:
+            return dict(job)
+    return cache.get(_key(job_id))
+
+def is_running(job_id):
+    job = get(job_id)
+    return bool(job) and job.get('state') in ('queued', 'running') and time.time() - job.get('heartbeat', 0) < STALE_AFTER
+
+def abandoned(job_id):
+    """True for a job that stopped before finishing: interrupted, or its worker died"""
+    job = get(job_id)
+    return bool(job) and job.get('state') in ('queued', 'running', 'interrupted') and not is_running(job_id)
+
+def stopping(job_id):
+    with _lock:
+        entry = _running.get(job_id)
+    return bool(entry) and entry[1].is_set()
+
+def stop_all(timeout=STOP_TIMEOUT):
+    """Ask this process's jobs to stop and wait for them; any still going are marked interrupted"""
+    with _lock:
+        entries = list(_running.items())
+    for _, (_, stop) in entries:
+        stop.set()
+    deadline = time.monotonic() + timeout
+    for job_id, (thread, _) in entries:
+        thread.join(max(0, deadline - time.monotonic()))
+        if thread.is_alive():
+            update(job_id, state='interrupted', finished_at=datetime.utcnow().isoformat())
+
+def start(kind, target, job_id=None, lease=None, **kwargs):
+    """Run target(job_id, **kwargs) in the background and return the job id.
+
+    lease names a cache key that the heartbeat keeps pointing at job_id and the
+    job deletes when it ends, so a claim taken on it dies with the worker.
+    """
+    app = current_app._get_current_object()
+    job_id = job_id or uuid.uuid4().hex
+    update(job_id, kind=kind, state='queued', error=None, result=None,
+           started_at=datetime.utcnow().isoformat(), finished_at=None)
+
+    finished = threading.Event()
+    stop = threading.Event()
+
+    def beat():
+        while not finished.wait(HEARTBEAT_INTERVAL):
+            update(job_id)
+            if lease:
+                cache.set(lease, job_id, ttl=LEASE_TTL)
+
+    def run():
+        threading.Thread(target=beat, name=f'job-{kind}-{job_id[:8]}-heartbeat', daemon=True).start()
+        with app.app_context():
+            update(job_id, state='running')
+            try:
+                result = target(job_id, **kwargs)
+                update(job_id, state='interrupted' if stop.is_set() else 'finished', result=result,
+                       finished_at=datetime.utcnow().isoformat())
+            except Exception as e:
+                db.session.rollback()
+                update(job_id, state='failed', error=str(e), finished_at=datetime.utcnow().isoformat())
+            finally:
+                finished.set()
+                with _lock:
+                    _running.pop(job_id, None)
+                if lease:
+                    cache.delete(lease)
+                db.session.remove()
+
+    thread = threading.Thread(target=run, name=f'job-{kind}-{job_id[:8]}', daemon=True)
+    with _lock:
+        _running[job_id] = (thread, stop)
+    thread.start()
+    return job_id
@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+import time
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from app.services import cache
+
+# Per-endpoint request metrics, collected from Flask request hooks and
+# SQLAlchemy cursor events. Each worker keeps its own counters and publishes a
+# snapshot to Redis every few seconds, so a scrape that lands on any worker
+# can report the totals for all of them.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PUBLISH_INTERVAL = float(os.getenv('METRICS_PUBLISH_INTERVAL', 5))
+WORKER_STALE_AFTER = 300
+WORKERS_KEY = 'metrics:workers'
+
+_endpoints = {}
+_lock = threading.Lock()
+_published_at = 0.0
+
+def _new_entry():
+    return {
+        'statuses': {},
+        'latency_sum': 0.0,
+        'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+        'sql_queries': 0,
+        'sql_seconds': 0.0,
+        'bytes': 0,
+    }
+
+def _endpoint_label():
+    rule = request.url_rule
+    return f'{request.method} {rule.rule if rule else "unmatched"}'
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+
+def _after_request(response):
+    started = g.get('metrics_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    size = None if response.is_streamed else response.calculate_content_length()
+    bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if elapsed <= bound), len(LATENCY_BUCKETS))
+    label = _endpoint_label()
+    status = str(response.status_code)
+
+    with _lock:
+        entry = _endpoints.setdefault(label, _new_entry())
+        entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+        entry['latency_sum'] += elapsed
+        entry['buckets'][bucket] += 1
+        entry['sql_queries'] += g.get('sql_queries', 0)
+        entry['sql_seconds'] += g.get('sql_seconds', 0.0)
+        entry['bytes'] += size or 0
+
+    _maybe_publish()
+    return response
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('metrics_query_started')
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    if has_request_context():
+        g.sql_queries = g.get('sql_queries', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+
+def init_app(app, db):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+def snapshot():
+    with _lock:
+        endpoints = json.loads(json.dumps(_endpoints))
+    return {
+        'at': time.time(),
+        'endpoints': endpoints,
+        'cache': {name: tier.to_dict() for name, tier in cache.stats.items()},
+    }
+
+def _maybe_publish(force=False):
+    global _published_at
+    now = time.monotonic()
+    if not force and now - _published_at < PUBLISH_INTERVAL:
+        return
+    _published_at = now
+    client = cache.get_redis()
+    if client is None:
+        return
+    try:
+        client.hset(WORKERS_KEY, str(os.getpid()), json.dumps(snapshot()))
+    except Exception:
+        cache.breaker.failure()
+
+def _worker_snapshots():
+    """Snapshots from every live worker; just this process when Redis is unavailable"""
+    own = snapshot()
+    _maybe_publish(force=True)
+    client = cache.get_redis()
+    if client is None:
+        return {str(os.getpid()): own}
+    try:
+        raw = client.hgetall(WORKERS_KEY)
+    except Exception:
+        cache.breaker.failure()
+        return {str(os.getpid()): own}
+    workers = {}
+    for pid, data in raw.items():
+        worker = json.loads(data)
+        if time.time() - worker['at'] > WORKER_STALE_AFTER:
+            client.hdel(WORKERS_KEY, pid)
+            continue
+        workers[pid] = worker
+    workers[str(os.getpid())] = own
+    return workers
+
+def _merge(workers):
+    endpoints = {}
+    cache_totals = {}
+    for worker in workers.values():
+        for label, entry in worker['endpoints'].items():
+            total = endpoints.setdefault(label, _new_entry())
+            for status, count in entry['statuses'].items():
+                total['statuses'][status] = total['statuses'].get(status, 0) + count
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+            for field in ('latency_sum', 'sql_queries', 'sql_seconds', 'bytes'):
+                total[field] += entry[field]
+        for tier, stats in worker['cache'].items():
+            total = cache_totals.setdefault(tier, {'hits': 0, 'misses': 0, 'errors': 0})
+            for field in total:
+                total[field] += stats[field]
+    return endpoints, cache_totals
+
+def _percentile(buckets, fraction):
+    count = sum(buckets)
+    if not count:
+        return None
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= count * fraction:
+            return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else None
+
+def _labels(label, **extra):
+    method, path = label.split(' ', 1)
+    pairs = {'method': method, 'endpoint': path, **extra}
+    return ','.join(f'{k}="{v}"' for k, v in pairs.items())
+
+def render_prometheus():
+    endpoints, cache_totals = _merge(_worker_snapshots())
+    lines = [
+        '# HELP http_requests_total Requests handled, by endpoint and status',
+        '# TYPE http_requests_total counter',
+    ]
+    for label, entry in sorted(endpoints.items()):
+        for status, count in sorted(entry['statuses'].items()):
+            lines.append(f'http_requests_total{{{_labels(label, status=status)}}} {count}')
+
+    lines += [
+        '# HELP http_request_duration_seconds Time spent in the Flask handler',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for label, entry in sorted(endpoints.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), entry['buckets']):
+            cumulative += count
+            lines.append(f'http_request_duration_seconds_bucket{{{_labels(label, le=bound)}}} {cumulative}')
+        lines.append(f'http_request_duration_seconds_sum{{{_labels(label)}}} {entry["latency_sum"]:.6f}')
+        lines.append(f'http_request_duration_seconds_count{{{_labels(label)}}} {cumulative}')
+
+    for name, field, kind, help_text in (
+        ('db_queries_total', 'sql_queries', 'counter', 'SQL statements executed while handling requests'),
+        ('db_query_duration_seconds_total', 'sql_seconds', 'counter', 'Time spent in SQL statements'),
+        ('http_response_bytes_total', 'bytes', 'counter', 'Response body bytes (streamed responses excluded)'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for label, entry in sorted(endpoints.items()):
+            value = entry[field]
+            lines.append(f'{name}{{{_labels(label)}}} {value:.6f}' if isinstance(value, float) else f'{name}{{{_labels(label)}}} {value}')
+
+    lines += [
+        '# HELP cache_requests_total Cache lookups by tier and result',
+        '# TYPE cache_requests_total counter',
+    ]
+    for tier, stats in sorted(cache_totals.items()):
+        for result, field in (('hit', 'hits'), ('miss', 'misses'), ('error', 'errors')):
+            lines.append(f'cache_requests_total{{tier="{tier}",result="{result}"}} {stats[field]}')
+    return '\n'.join(lines) + '\n'
+
+def summary(limit=10):
+    """Slowest endpoints by total handler time, for /api/admin/diagnostics"""
+    workers = _worker_snapshots()
+    endpoints, cache_totals = _merge(workers)
+    rows = []
+    for label, entry in endpoints.items():
+        count = sum(entry['buckets'])
+        if not count:
+            continue
+        p95 = _percentile(entry['buckets'], 0.95)
+        rows.append({
+            'endpoint': label,
+            'count': count,
+            'errors': sum(n for status, n in entry['statuses'].items() if status.startswith('5')),
+            'total_ms': round(entry['latency_sum'] * 1000, 1),
+            'avg_ms': round(entry['latency_sum'] * 1000 / count, 2),
+            'p95_le_ms': p95 * 1000 if p95 is not None else None,
+            'avg_queries': round(entry['sql_queries'] / count, 2),
+            'avg_sql_ms': round(entry['sql_seconds'] * 1000 / count, 2),
+            'avg_bytes': round(entry['bytes'] / count),
+        })
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    lookups = {tier: stats['hits'] + stats['misses'] for tier, stats in cache_totals.items()}
+    return {
+        'workers': len(workers),
+        'endpoints': rows[:limit],
+        'cache_hit_ratio': {
+            tier: round(stats['hits'] / lookups[tier], 4) if lookups[tier] else None
+            for tier, stats in cache_totals.items()
+        },
+    }
@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from app.services import cache
+
+OTP_TTL = 600
+MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', 5))
+# wrong guesses are counted per username over this window, across new codes
+ATTEMPT_WINDOW = int(os.getenv('OTP_ATTEMPT_WINDOW', OTP_TTL))
+SWEEP_INTERVAL = float(os.getenv('OTP_SWEEP_INTERVAL', 60))
+
+# verify() results
+OK = 'ok'
+MISSING = 'missing'
+EXPIRED = 'expired'
+INVALID = 'invalid'
+LOCKED = 'locked'
+
+class LocalOTPStore:
+    """Per-process store; only correct with a single worker"""
+
+    def __init__(self, sweep_interval=SWEEP_INTERVAL):
+        self.sweep_interval = sweep_interval
+        self._codes = {}
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    def _start_sweeper(self):
+        # started lazily so a preloading server doesn't fork a running thread
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_forever, name='otp-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            for username in [u for u, entry in self._codes.items() if entry['expires_at'] < now]:
+                del self._codes[username]
+            for username in [u for u, (_, expires_at) in self._attempts.items() if expires_at < now]:
+                del self._attempts[username]
+
+    def _failed_attempts(self, username):
+        count, expires_at = self._attempts.get(username, (0, 0))
+        return count if expires_at >= time.time() else 0
+
+    def issue(self, username, otp, ttl=OTP_TTL):
+        with self._lock:
+            self._start_sweeper()
+            self._codes[username] = {'otp': otp, 'expires_at': time.time() + ttl}
+
+    def verify(self, username, otp):
+        with self._lock:
+            if self._failed_attempts(username) >= MAX_ATTEMPTS:
+                self._codes.pop(username, None)
+                return LOCKED
+            stored = self._codes.get(username)
+            if not stored:
+                return MISSING
+            if time.time() > stored['expires_at']:
+                del self._codes[username]
+                return EXPIRED
+            if stored['otp'] != otp:
+                attempts = self._failed_attempts(username) + 1
+                self._attempts[username] = (attempts, time.time() + ATTEMPT_WINDOW)
+                if attempts >= MAX_ATTEMPTS:
+                    del self._codes[username]
+                    return LOCKED
+                return INVALID
+            del self._codes[username]
+            self._attempts.pop(username, None)
+            return OK
+
+class RedisOTPStore:
+    """Shared store; codes and attempt counters expire through Redis TTLs"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def issue(self, username, otp, ttl=OTP_TTL):
+        # the attempt counter is left alone, so a new code does not lift a lockout
+        self.client.set(f'otp:code:{username}', otp, ex=ttl)
+
+    def verify(self, username, otp):
+        code_key = f'otp:code:{username}'
+        attempts_key = f'otp:attempts:{username}'
+        stored, attempts = self.client.mget(code_key, attempts_key)
+        if int(attempts or 0) >= MAX_ATTEMPTS:
+            self.client.delete(code_key)
+            return LOCKED
+        if stored is None:
+            return MISSING
+        if stored != otp:
+            pipe = self.client.pipeline()
+            pipe.incr(attempts_key)
+            pipe.expire(attempts_key, ATTEMPT_WINDOW)
+            attempts, _ = pipe.execute()
+            if attempts >= MAX_ATTEMPTS:
+                self.client.delete(code_key)
+                return LOCKED
+            return INVALID
+        # only the request that actually removes the code may log in with it
+        if not self.client.delete(code_key):
+            return MISSING
+        self.client.delete(attempts_key)
+        return OK
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _create_store(os.getenv('OTP_BACKEND', 'auto').lower())
+    return _store
+
+def _create_store(backend):
+    if backend == 'local':
+        return LocalOTPStore()
+    if backend == 'redis' or os.getenv('REDIS_HOST'):
+        # no silent fallback: per-process codes break as soon as there are two workers
+        return RedisOTPStore(cache.client())
+    return LocalOTPStore()
@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+class PaginationError(ValueError):
+    pass
+
+def requested(args=None):
+    """List endpoints only switch to the paged envelope when a client asks for it"""
+    args = request.args if args is None else args
+    return 'limit' in args or 'cursor' in args
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token, sort_column):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+        if sort_value is not None and sort_column.type.python_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+def _parse_date(value, name):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise PaginationError(f'Invalid {name}')
+
+def filter_query(query, args=None, status=None, role=None, username=None, created=None):
+    """Apply the shared list filters for whichever columns the endpoint supports"""
+    args = request.args if args is None else args
+    if status is not None and args.get('status'):
+        query = query.filter(status == args['status'])
+    if role is not None and args.get('role'):
+        query = query.filter(role == args['role'])
+    if username is not None and args.get('username'):
+        query = query.filter(username.startswith(args['username'].lower(), autoescape=True))
+    if created is not None:
+        if args.get('created_after'):
+            query = query.filter(created >= _parse_date(args['created_after'], 'created_after'))
+        if args.get('created_before'):
+            query = query.filter(created < _parse_date(args['created_before'], 'created_before'))
+    return query
+
+def paginate(query, sort_column, id_column, serialize, args=None, descending=True, many=False):
+    """Keyset page over (sort_column, id_column); returns the JSON envelope.
+
+    serialize takes one row, or the whole page when many=True (e.g. View.serialize_all).
+    """
+    args = request.args if args is None else args
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise PaginationError('Invalid limit')
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    page = {}
+    if args.get('count', '').lower() in ('1', 'true', 'yes'):
+        page['total'] = query.order_by(None).count()
+
+    if args.get('cursor'):
+        sort_value, last_id = decode_cursor(args['cursor'], sort_column)
+        if descending:
+            query = query.filter(or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > sort_value,
+                and_(sort_column == sort_value, id_column > last_id)
+            ))
+
+    order = (sort_column.desc(), id_column.desc()) if descending else (sort_column.asc(), id_column.asc())
+    rows = query.order_by(None).order_by(*order).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    page['items'] = serialize(rows) if many else [serialize(row) for row in rows]
+    page['next_cursor'] = None
+    if has_more:
+        page['next_cursor'] = encode_cursor(getattr(rows[-1], sort_column.key), getattr(rows[-1], id_column.key))
+    return page
@@ -0,0 +1,31 @@
+from collections import namedtuple
+
+PricingConfig = namedtuple('PricingConfig', ['base_price', 'max_discount_percent', 'max_invites'])
+
+def pricing_config(config):
+    if not config or config.ticket_price is None:
+        return None
+    return PricingConfig(
+        base_price=float(config.ticket_price),
+        max_discount_percent=float(config.max_discount_percent) if config.max_discount_percent else 0.0,
+        max_invites=config.max_invites_per_user or 1
+    )
+
+def unit_price(pricing, accepted_invites):
+    if pricing is None:
+        return 0.0
+    discount_fraction = min(accepted_invites / pricing.max_invites, 1.0) if pricing.max_invites > 0 else 0
+    discount_pct = pricing.max_discount_percent * discount_fraction
+    return pricing.base_price * (1 - discount_pct / 100)
+
+def ticket_price(pricing, accepted_invites):
+    return round(unit_price(pricing, accepted_invites), 2)
+
+def bar_discount(preset_percent, tiers, invite_count):
+    """tiers is a list of (invite_count, discount_percent) sorted by invite_count descending"""
+    if preset_percent is not None:
+        return preset_percent
+    for required, percent in tiers:
+        if invite_count >= required:
+            return percent
+    return 0.0
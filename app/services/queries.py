@@ -0,0 +1,17 @@
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import User, Invitation
+
+def invitations_with_inviter():
+    """Column-only invitation rows annotated with the inviter's username in one joined query"""
+    inviter = aliased(User)
+    return db.session.query(
+        Invitation.id,
+        Invitation.inviter_id,
+        inviter.username.label('inviter_username'),
+        Invitation.invitee_username,
+        Invitation.invitee_instagram_id,
+        Invitation.status,
+        Invitation.created_at,
+        Invitation.accepted_at,
+    ).outerjoin(inviter, inviter.id == Invitation.inviter_id)
@@ -0,0 +1,118 @@
+import os
+import re
+import threading
+from collections import deque
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# Development-time query recorder. While enabled it groups every statement a
+# request runs by shape, attributes lazy relationship loads to the attribute
+# that triggered them, and reports shapes repeated N_PLUS_ONE_THRESHOLD times
+# or more. query_budget caps the statements a view may run; the count comes
+# from the metrics hooks, so budgets are checked even when the recorder is off.
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+RECENT_FINDINGS = 50
+
+_findings = deque(maxlen=RECENT_FINDINGS)
+_findings_lock = threading.Lock()
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+def _shape(statement):
+    # IN-lists expanded by the dialect would make otherwise identical shapes differ
+    return re.sub(r'\(\s*(?:\?|%s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%s|\$\d+|:\w+))*\s*\)', '(...)', ' '.join(statement.split()))
+
+def enabled(app=None):
+    app = app or current_app
+    return app.config.get('QUERY_AUDIT', False)
+
+def strict(app=None):
+    app = app or current_app
+    return app.testing or app.config.get('QUERY_BUDGET_STRICT', False)
+
+def _before_request():
+    if enabled():
+        g.query_shapes = {}
+
+def _do_orm_execute(orm_execute_state):
+    if not orm_execute_state.is_relationship_load or not has_request_context() or 'query_shapes' not in g:
+        return
+    path = orm_execute_state.loader_strategy_path.path
+    if len(path) >= 2:
+        g.query_audit_attribute = f'{path[-2].class_.__name__}.{path[-1].key}'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or 'query_shapes' not in g:
+        return
+    shape = _shape(statement)
+    entry = g.query_shapes.setdefault(shape, {'count': 0, 'attribute': None})
+    entry['count'] += 1
+    attribute = g.pop('query_audit_attribute', None)
+    if attribute:
+        entry['attribute'] = attribute
+
+def findings_for_request():
+    shapes = g.get('query_shapes') or {}
+    return [
+        {'count': entry['count'], 'attribute': entry['attribute'], 'statement': shape[:300]}
+        for shape, entry in shapes.items()
+        if entry['count'] >= N_PLUS_ONE_THRESHOLD
+    ]
+
+def _after_request(response):
+    if 'query_shapes' not in g:
+        return response
+    response.headers['X-Query-Count'] = str(sum(entry['count'] for entry in g.query_shapes.values()))
+    repeated = findings_for_request()
+    if repeated:
+        route = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+        for finding in repeated:
+            current_app.logger.warning(
+                'N+1 in %s: %d x %s%s', route, finding['count'],
+                finding['attribute'] or 'query', f" ({finding['statement'][:120]})"
+            )
+        with _findings_lock:
+            _findings.append({'route': route, 'repeated': repeated})
+        response.headers['X-N-Plus-One'] = ', '.join(
+            f"{finding['attribute'] or 'query'} x{finding['count']}" for finding in repeated
+        )
+    return response
+
+def recent_findings():
+    with _findings_lock:
+        return list(_findings)
+
+def init_app(app, db):
+    app.config.setdefault('QUERY_AUDIT', os.getenv('QUERY_AUDIT', os.getenv('FLASK_ENV', '')).lower() in ('true', 'development'))
+    app.config.setdefault('QUERY_BUDGET_STRICT', os.getenv('QUERY_BUDGET_STRICT', 'false').lower() == 'true')
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    event.listen(db.session, 'do_orm_execute', _do_orm_execute)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+
+def query_budget(max_queries):
+    """Fail (testing / QUERY_BUDGET_STRICT) or warn when a view runs more than max_queries statements"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            result = f(*args, **kwargs)
+            used = g.get('sql_queries', 0)
+            if used > max_queries:
+                message = f'{request.endpoint} ran {used} queries (budget {max_queries})'
+                if 'query_shapes' in g:
+                    message += '; repeated: ' + ', '.join(
+                        f"{finding['attribute'] or finding['statement'][:80]} x{finding['count']}"
+                        for finding in findings_for_request()
+                    )
+                if strict():
+                    raise QueryBudgetExceeded(message)
+                current_app.logger.warning('Query budget exceeded: %s', message)
+            return result
+        # outer decorators copy this through functools.wraps, so tests can find every budgeted view
+        decorated_function.query_budget = max_queries
+        return decorated_function
+    return decorator
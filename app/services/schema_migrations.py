@@ -0,0 +1,133 @@
+import hashlib
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy import inspect, select
+from app import db
+from app.models import SchemaMigration, User, RoleSalary
+
+# Tracked migration runner. Every applied .sql file is recorded in
+# schema_migrations with its checksum, so a boot only runs files it has not
+# seen before and each one gets its own transaction.
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / 'migrations'
+NO_TRANSACTION_MARKER = '-- migrate:no-transaction'
+
+# The untracked runner re-executed these on every boot, so a database that
+# already holds data has them applied. Running them again is not safe:
+# 20260107_tickets_and_security.sql drops the tickets table.
+LEGACY_MIGRATIONS = (
+    '20260107_pricing_and_roles.sql',
+    '20260107_tickets_and_security.sql',
+    'add_event_place_and_public_flags.sql',
+    'role_salaries.sql',
+)
+
+Migration = namedtuple('Migration', ['name', 'checksum', 'sql'])
+
+class MigrationError(Exception):
+    pass
+
+def discover(directory=MIGRATIONS_DIR):
+    migrations = []
+    for path in sorted(Path(directory).glob('*.sql')):
+        raw = path.read_bytes()
+        migrations.append(Migration(path.name, hashlib.sha256(raw).hexdigest(), raw.decode()))
+    return migrations
+
+def statements(sql):
+    return [s.strip() for s in sql.split(';') if s.strip()]
+
+def _tracking():
+    return inspect(db.engine).has_table(SchemaMigration.__tablename__)
+
+def applied():
+    if not _tracking():
+        return {}
+    return dict(db.session.query(SchemaMigration.filename, SchemaMigration.checksum).all())
+
+def plan(directory=MIGRATIONS_DIR):
+    """Return (pending, changed): files never applied, and applied files whose contents changed since"""
+    done = applied()
+    pending, changed = [], []
+    for migration in discover(directory):
+        if migration.name not in done:
+            pending.append(migration)
+        elif done[migration.name] != migration.checksum:
+            changed.append(migration)
+    return pending, changed
+
+def is_current(directory=MIGRATIONS_DIR):
+    pending, changed = plan(directory)
+    return not pending and not changed
+
+def _record(migration):
+    db.session.add(SchemaMigration(filename=migration.name, checksum=migration.checksum, applied_at=datetime.utcnow()))
+
+def _has_data():
+    tables = inspect(db.engine)
+    return any(
+        # primary keys only, so columns added by later migrations cannot break adopting an old database
+        tables.has_table(model.__tablename__)
+        and db.session.execute(select(model.__table__.c.id).limit(1)).first() is not None
+        for model in (User, RoleSalary)
+    )
+
+def baseline(directory=MIGRATIONS_DIR):
+    """First tracked run: create the model schema and adopt the legacy files if the database already ran them.
+
+    Returns the names marked as applied without executing them.
+    """
+    db.create_all()
+    adopted = []
+    if _has_data():
+        for migration in discover(directory):
+            if migration.name in LEGACY_MIGRATIONS:
+                _record(migration)
+                adopted.append(migration.name)
+    db.session.commit()
+    return adopted
+
+def apply(migration):
+    if migration.sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        # e.g. CREATE INDEX CONCURRENTLY, which Postgres refuses inside a transaction;
+        # these files must be idempotent since a failure leaves them half applied
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            for statement in statements(migration.sql):
+                conn.execute(db.text(statement))
+        _record(migration)
+        db.session.commit()
+        return
+    try:
+        for statement in statements(migration.sql):
+            db.session.execute(db.text(statement))
+        _record(migration)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+def migrate(directory=MIGRATIONS_DIR, dry_run=False, log=print):
+    """Apply every pending migration in filename order; returns the names applied (or planned)"""
+    adopted = set()
+    if not applied():
+        if dry_run:
+            if _has_data():
+                adopted = {m.name for m in discover(directory) if m.name in LEGACY_MIGRATIONS}
+            log('baseline create_all' + (f', adopting {len(adopted)} legacy migration(s)' if adopted else ''))
+        else:
+            for name in baseline(directory):
+                log(f'adopted {name}')
+    
+    pending, changed = plan(directory)
+    pending = [m for m in pending if m.name not in adopted]
+    if changed:
+        raise MigrationError(
+            'Applied migrations were modified: ' + ', '.join(m.name for m in changed)
+        )
+    
+    for migration in pending:
+        if not dry_run:
+            apply(migration)
+        log(f'{"pending" if dry_run else "applied"} {migration.name}')
+    return [m.name for m in pending]
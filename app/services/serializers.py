@@ -0,0 +1,176 @@
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import (
+    Ticket, BarTransaction, BarInventory, PresetDiscount, ManagerCall, SecurityJob,
+    security_job_assignments
+)
+
+# Declarative list views. Each view names the columns, related columns and
+# association collections its dicts need; rows come back from one column-only
+# query (related rows outer-joined) plus one IN query per collection, and are
+# turned into dicts identical to the model's to_dict() without building ORM
+# objects or touching lazy relationships.
+
+IN_CHUNK_SIZE = 5000
+
+def iso(value):
+    return value.isoformat() if value is not None else None
+
+def number(value):
+    return float(value) if value is not None else None
+
+class Field:
+    def __init__(self, column, convert=None):
+        self.column = column
+        self.convert = convert
+
+class Related:
+    """A column on the row a many-to-one relationship points at; None when there isn't one"""
+
+    def __init__(self, relationship, attribute, convert=None):
+        self.relationship = relationship
+        self.attribute = attribute
+        self.column = None  # bound to the view's alias for the relationship
+        self.convert = convert
+
+class Collection:
+    """Child ids from an association table, loaded for the whole page in one query"""
+
+    def __init__(self, parent_column, child_column, convert=list):
+        self.parent_column = parent_column
+        self.child_column = child_column
+        self.convert = convert
+
+    def load(self, parent_ids):
+        loaded = {parent_id: [] for parent_id in parent_ids}
+        ids = list(loaded)
+        # chunked so huge pages stay under driver bind-parameter limits
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            rows = db.session.query(self.parent_column, self.child_column).filter(
+                self.parent_column.in_(ids[start:start + IN_CHUNK_SIZE])
+            )
+            for parent_id, child_id in rows:
+                loaded[parent_id].append(child_id)
+        return loaded
+
+class View:
+    def __init__(self, model, **fields):
+        self.model = model
+        self.fields = fields
+        self.joins = []
+        aliases = {}
+        for spec in fields.values():
+            if isinstance(spec, Related):
+                key = spec.relationship.key
+                if key not in aliases:
+                    aliases[key] = aliased(spec.relationship.property.mapper.class_)
+                    self.joins.append((spec.relationship, aliases[key]))
+                spec.column = getattr(aliases[key], spec.attribute)
+
+    def column(self, key):
+        return self.fields[key].column
+
+    def query(self):
+        columns = [
+            spec.column.label(key) for key, spec in self.fields.items()
+            if not isinstance(spec, Collection)
+        ]
+        query = db.session.query(*columns).select_from(self.model)
+        for relationship, alias in self.joins:
+            query = query.outerjoin(relationship.of_type(alias))
+        return query
+
+    def serialize_all(self, rows):
+        collections = {}
+        for spec in self.fields.values():
+            if isinstance(spec, Collection):
+                key = (spec.parent_column, spec.child_column)
+                if key not in collections:
+                    collections[key] = spec.load([row.id for row in rows])
+
+        result = []
+        for row in rows:
+            item = {}
+            for key, spec in self.fields.items():
+                if isinstance(spec, Collection):
+                    value = spec.convert(collections[(spec.parent_column, spec.child_column)][row.id])
+                else:
+                    value = getattr(row, key)
+                    if spec.convert:
+                        value = spec.convert(value)
+                item[key] = value
+            result.append(item)
+        return result
+
+    def all(self, query=None):
+        return self.serialize_all((query if query is not None else self.query()).all())
+
+TICKETS = View(
+    Ticket,
+    id=Field(Ticket.id),
+    user_id=Field(Ticket.user_id),
+    username=Related(Ticket.user, 'username'),
+    qr_code=Field(Ticket.qr_code),
+    verified=Field(Ticket.verified),
+    verified_at=Field(Ticket.verified_at, iso),
+    verified_by=Field(Ticket.verified_by),
+    status=Field(Ticket.status),
+    created_at=Field(Ticket.created_at, iso),
+    updated_at=Field(Ticket.updated_at, iso),
+)
+
+TRANSACTIONS = View(
+    BarTransaction,
+    id=Field(BarTransaction.id),
+    bartender_id=Field(BarTransaction.bartender_id),
+    bartender_name=Related(BarTransaction.bartender, 'username'),
+    customer_id=Field(BarTransaction.customer_id),
+    customer_name=Related(BarTransaction.customer, 'username'),
+    items_json=Field(BarTransaction.items_json),
+    total_amount=Field(BarTransaction.total_amount, number),
+    discount_applied=Field(BarTransaction.discount_applied, number),
+    actual_amount=Field(BarTransaction.actual_amount, number),
+    completed_at=Field(BarTransaction.completed_at, iso),
+)
+
+INVENTORY = View(
+    BarInventory,
+    id=Field(BarInventory.id),
+    item_id=Field(BarInventory.item_id),
+    item_name=Related(BarInventory.item, 'name'),
+    quantity=Field(BarInventory.quantity),
+    last_updated=Field(BarInventory.last_updated, iso),
+)
+
+PRESET_DISCOUNTS = View(
+    PresetDiscount,
+    id=Field(PresetDiscount.id),
+    user_id=Field(PresetDiscount.user_id),
+    username=Related(PresetDiscount.user, 'username'),
+    discount_percent=Field(PresetDiscount.discount_percent, number),
+    reason=Field(PresetDiscount.reason),
+)
+
+MANAGER_CALLS = View(
+    ManagerCall,
+    id=Field(ManagerCall.id),
+    user_id=Field(ManagerCall.user_id),
+    username=Related(ManagerCall.user, 'username'),
+    reason=Field(ManagerCall.reason),
+    status=Field(ManagerCall.status),
+    created_at=Field(ManagerCall.created_at, iso),
+    resolved_at=Field(ManagerCall.resolved_at, iso),
+)
+
+SECURITY_JOBS = View(
+    SecurityJob,
+    id=Field(SecurityJob.id),
+    title=Field(SecurityJob.title),
+    description=Field(SecurityJob.description),
+    required_people=Field(SecurityJob.required_people),
+    assigned_count=Collection(security_job_assignments.c.job_id, security_job_assignments.c.user_id, len),
+    assigned_user_ids=Collection(security_job_assignments.c.job_id, security_job_assignments.c.user_id),
+    status=Field(SecurityJob.status),
+    created_at=Field(SecurityJob.created_at, iso),
+    updated_at=Field(SecurityJob.updated_at, iso),
+)
@@ -0,0 +1,16 @@
+import json
+from flask import Response, stream_with_context
+
+STREAM_BATCH_SIZE = 500
+
+def json_array_response(query, serialize, batch_size=STREAM_BATCH_SIZE):
+    """Stream query rows as a JSON array without holding the result set in memory"""
+    def generate():
+        yield '['
+        separator = ''
+        for row in query.yield_per(batch_size):
+            yield separator + json.dumps(serialize(row), default=str)
+            separator = ','
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
@@ -0,0 +1,90 @@
+import os
+import uuid
+from sqlalchemy import case, exists, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Ticket, User
+from app.services import cache, jobs, ticket_index, ticket_signing, ticket_sync
+
+# Creates tickets ahead of time for everyone who can attend, so the rush
+# after an announcement only reads them back. A background job inserts them
+# in batches. tickets.user_id is unique and the insert skips conflicts, so a
+# holder generating their own ticket meanwhile keeps it. Each batch shares a
+# single change stamp, which the scanner feed already handles. With signed
+# codes a batch gets one extra UPDATE to swap in the codes, because a code
+# covers its ticket id. Only one run at a time: start() claims JOB_KEY as the
+# job's lease, which lapses within jobs.LEASE_TTL if the worker dies. A run
+# that was stopped or killed is finished by starting another one, since only
+# users still without a ticket are picked.
+
+BATCH_SIZE = int(os.getenv('TICKET_BULK_BATCH_SIZE', 1000))
+JOB_KEY = 'tickets:bulk:job'
+
+def _candidates():
+    return [
+        user_id for (user_id,) in db.session.query(User.id).filter(
+            User.is_banned.isnot(True),
+            User.attending.isnot(False),
+            ~exists().where(Ticket.user_id == User.id)
+        ).order_by(User.id)
+    ]
+
+def _insert(table):
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(table).on_conflict_do_nothing(index_elements=['user_id'])
+
+def _insert_batch(user_ids, signed):
+    tickets = Ticket.__table__
+    seq = db.session.execute(select(ticket_sync.next_change())).scalar()
+    rows = [{'user_id': user_id, 'qr_code': str(uuid.uuid4()), 'change_seq': seq} for user_id in user_ids]
+    # skipped rows are not returned
+    created = db.session.execute(_insert(tickets).returning(tickets.c.id, tickets.c.user_id), rows).all()
+    if created and signed:
+        holders = ticket_index.holders([row.user_id for row in created])
+        codes = {row.id: ticket_signing.sign(row.id, holders[row.user_id]) for row in created}
+        db.session.execute(
+            update(tickets).where(tickets.c.id.in_(list(codes)))
+            .values(qr_code=case(codes, value=tickets.c.id))
+        )
+    db.session.commit()
+    return len(created)
+
+def run(job_id):
+    user_ids = _candidates()
+    signed = ticket_signing.enabled()
+    db.session.commit()
+
+    total = len(user_ids)
+    done = created = 0
+    jobs.update(job_id, total=total, done=0, created=0)
+    try:
+        for start in range(0, total, BATCH_SIZE):
+            if jobs.stopping(job_id):
+                break
+            batch = user_ids[start:start + BATCH_SIZE]
+            created += _insert_batch(batch, signed)
+            done += len(batch)
+            jobs.update(job_id, done=done, created=created)
+    finally:
+        if created:
+            ticket_index.invalidate()
+    return {'total': total, 'created': created, 'skipped': done - created}
+
+def start():
+    """Job id of the new run, or None while one is still going"""
+    job_id = uuid.uuid4().hex
+    if not cache.add(JOB_KEY, job_id, ttl=jobs.LEASE_TTL):
+        return None
+    return jobs.start('ticket_bulk', run, job_id=job_id, lease=JOB_KEY)
+
+def status(job_id):
+    job = jobs.get(job_id)
+    if not job or job.get('kind') != 'ticket_bulk':
+        return None
+    result = {key: job.get(key) for key in (
+        'id', 'state', 'total', 'done', 'created', 'result', 'error', 'started_at', 'finished_at'
+    )}
+    if jobs.abandoned(job_id):
+        # stopped by a recycled worker, or its worker died
+        result['state'] = 'interrupted'
+    return result
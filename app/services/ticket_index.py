@@ -0,0 +1,299 @@
+import os
+import threading
+import time
+import uuid
+from sqlalchemy import func
+from app import db
+from app.services import cache, pricing
+
+# The index keeps everything verify_ticket needs per qr_code in process memory,
+# so a door scan is one dict lookup plus the write of the verified flag.
+# Changes made by other workers are picked up every SYNC_INTERVAL: a changed
+# user is published on a Redis stream and reloaded on its own, while pricing
+# changes bump a shared generation stamp that rebuilds everything. Tickets
+# created elsewhere fall back to a single lookup.
+# refresh_user / refresh_pricing also restamp the affected tickets for the
+# scanner change feed (ticket_sync).
+
+GENERATION_KEY = 'tickets:index:generation'
+GENERATION_TTL = 86400
+USER_CHANGES_KEY = 'tickets:index:users'
+USER_CHANGES_MAX = 1000
+SYNC_INTERVAL = float(os.getenv('TICKET_INDEX_SYNC_INTERVAL', 2))
+# more misses than this in one lookup_many rebuild the index instead of loading tickets one by one
+RELOAD_LIMIT = 20
+
+_lock = threading.RLock()
+_entries = {}
+_qr_by_user = {}
+_users = {}
+_invites = {}
+_presets = {}
+_tiers = []
+_pricing = None
+_ready = False
+_generation = None
+_synced_at = 0.0
+# last USER_CHANGES_KEY entry applied; '0-0' while the stream was empty
+_user_cursor = '0-0'
+
+def _entry(ticket_id, qr_code, user_id, verified, verified_at):
+    user = _users.get(user_id, {})
+    invites = _invites.get(user_id, 0)
+    role = user.get('role')
+    return {
+        'ticket_id': ticket_id,
+        'qr_code': qr_code,
+        'user_id': user_id,
+        'username': user.get('username'),
+        'role': role,
+        'invites': invites,
+        'bar_discount': pricing.bar_discount(_presets.get(user_id), _tiers, invites),
+        'ticket_price': pricing.ticket_price(_pricing, invites) if role == 'user' else 0.0,
+        'verified': bool(verified),
+        'verified_at': verified_at,
+    }
+
+def _recompute_user(user_id):
+    qr_code = _qr_by_user.get(user_id)
+    if qr_code and qr_code in _entries:
+        old = _entries[qr_code]
+        _entries[qr_code] = _entry(old['ticket_id'], qr_code, user_id, old['verified'], old['verified_at'])
+
+def _load_pricing():
+    from app.models import EventConfig, InviteDiscount
+    global _tiers, _pricing
+    _tiers = [
+        (count, float(percent))
+        for count, percent in db.session.query(InviteDiscount.invite_count, InviteDiscount.discount_percent)
+        .order_by(InviteDiscount.invite_count.desc())
+    ]
+    _pricing = pricing.pricing_config(EventConfig.query.first())
+
+def _load_user(user_id):
+    from app.models import User, Invitation, PresetDiscount
+    row = db.session.query(User.username, User.role).filter(User.id == user_id).first()
+    if row:
+        _users[user_id] = {'username': row.username, 'role': row.role}
+    else:
+        _users.pop(user_id, None)
+    _invites[user_id] = Invitation.query.filter_by(inviter_id=user_id, status='accepted').count()
+    preset = db.session.query(PresetDiscount.discount_percent).filter_by(user_id=user_id).order_by(PresetDiscount.id).first()
+    if preset:
+        _presets[user_id] = float(preset.discount_percent)
+    else:
+        _presets.pop(user_id, None)
+
+def _user_changes_head():
+    client = cache.get_redis()
+    if client is None:
+        return '0-0'
+    try:
+        newest = client.xrevrange(USER_CHANGES_KEY, count=1)
+    except Exception:
+        cache.breaker.failure()
+        return '0-0'
+    return newest[0][0] if newest else '0-0'
+
+def _build():
+    from app.models import Ticket, User, Invitation, PresetDiscount
+    global _ready, _entries, _qr_by_user, _users, _invites, _presets, _user_cursor
+    # taken first: a change made during the build is applied again, never missed
+    _user_cursor = _user_changes_head()
+    _load_pricing()
+    _invites = dict(
+        db.session.query(Invitation.inviter_id, func.count(Invitation.id))
+        .filter(Invitation.status == 'accepted')
+        .group_by(Invitation.inviter_id)
+    )
+    _presets = {}
+    for user_id, percent in db.session.query(PresetDiscount.user_id, PresetDiscount.discount_percent).order_by(PresetDiscount.id.desc()):
+        _presets[user_id] = float(percent)
+    rows = db.session.query(
+        Ticket.id, Ticket.qr_code, Ticket.user_id, Ticket.verified, Ticket.verified_at, User.username, User.role
+    ).join(User, Ticket.user_id == User.id).all()
+    _users = {row.user_id: {'username': row.username, 'role': row.role} for row in rows}
+    _entries = {}
+    _qr_by_user = {}
+    for row in rows:
+        _entries[row.qr_code] = _entry(row.id, row.qr_code, row.user_id, row.verified, row.verified_at)
+        _qr_by_user[row.user_id] = row.qr_code
+    _ready = True
+
+def _sync():
+    global _ready, _generation, _synced_at
+    now = time.monotonic()
+    if now - _synced_at < SYNC_INTERVAL:
+        return
+    _synced_at = now
+    shared = cache.get(GENERATION_KEY)
+    if shared is not None and shared != _generation:
+        _generation = shared
+        _ready = False
+    if _ready:
+        _apply_user_changes()
+
+def _apply_user_changes():
+    global _ready, _user_cursor
+    client = cache.get_redis()
+    if client is None:
+        return
+    try:
+        # the cursor entry itself comes back first, plus one more than we would reload
+        entries = client.xrange(USER_CHANGES_KEY, min=_user_cursor, count=RELOAD_LIMIT + 2)
+    except Exception:
+        cache.breaker.failure()
+        return
+    if _user_cursor != '0-0':
+        if not entries or entries[0][0] != _user_cursor:
+            # our cursor was trimmed away; we can't tell what we missed
+            _ready = False
+            return
+        entries = entries[1:]
+    if len(entries) > RELOAD_LIMIT:
+        _ready = False
+        return
+    for entry_id, fields in entries:
+        user_id = int(fields['user'])
+        _load_user(user_id)
+        _recompute_user(user_id)
+        _user_cursor = entry_id
+
+def _publish_user(user_id):
+    client = cache.get_redis()
+    if client is None:
+        return False
+    try:
+        client.xadd(USER_CHANGES_KEY, {'user': user_id}, maxlen=USER_CHANGES_MAX, approximate=True)
+    except Exception:
+        cache.breaker.failure()
+        return False
+    return True
+
+def _bump_generation():
+    global _generation
+    _generation = uuid.uuid4().hex
+    cache.set(GENERATION_KEY, _generation, ttl=GENERATION_TTL)
+
+def warm():
+    with _lock:
+        _build()
+
+def lookup(qr_code):
+    with _lock:
+        _sync()
+        if not _ready:
+            _build()
+        entry = _entries.get(qr_code)
+        if entry is None:
+            entry = reload_ticket(qr_code)
+        return dict(entry) if entry else None
+
+def holders(user_ids):
+    """What a ticket of each user shows: username, role, invites, bar discount and price"""
+    from app.models import User, Invitation, PresetDiscount
+    with _lock:
+        _sync()
+        # a stale index only needs fresh pricing here, not a full rebuild
+        if not _ready:
+            _load_pricing()
+        tiers, config = _tiers, _pricing
+    invites = dict(
+        db.session.query(Invitation.inviter_id, func.count(Invitation.id))
+        .filter(Invitation.status == 'accepted', Invitation.inviter_id.in_(user_ids))
+        .group_by(Invitation.inviter_id)
+    )
+    presets = {}
+    for user_id, percent in db.session.query(PresetDiscount.user_id, PresetDiscount.discount_percent).filter(
+        PresetDiscount.user_id.in_(user_ids)
+    ).order_by(PresetDiscount.id.desc()):
+        presets[user_id] = float(percent)
+    result = {}
+    for user_id, username, role in db.session.query(User.id, User.username, User.role).filter(User.id.in_(user_ids)):
+        count = invites.get(user_id, 0)
+        result[user_id] = {
+            'user_id': user_id,
+            'username': username,
+            'role': role,
+            'invites': count,
+            'bar_discount': pricing.bar_discount(presets.get(user_id), tiers, count),
+            'ticket_price': pricing.ticket_price(config, count) if role == 'user' else 0.0,
+        }
+    return result
+
+def holder(user_id):
+    """What a ticket of user_id shows: username, role, invites, bar discount and price"""
+    return holders([user_id]).get(user_id)
+
+def lookup_many(qr_codes):
+    with _lock:
+        _sync()
+        if not _ready:
+            _build()
+        missing = [qr_code for qr_code in qr_codes if qr_code not in _entries]
+        if len(missing) > RELOAD_LIMIT:
+            _build()
+        else:
+            for qr_code in missing:
+                reload_ticket(qr_code)
+        return {qr_code: dict(_entries[qr_code]) for qr_code in qr_codes if qr_code in _entries}
+
+def reload_ticket(qr_code):
+    from app.models import Ticket
+    with _lock:
+        ticket = db.session.query(
+            Ticket.id, Ticket.user_id, Ticket.verified, Ticket.verified_at
+        ).filter(Ticket.qr_code == qr_code).first()
+        if not ticket:
+            _entries.pop(qr_code, None)
+            return None
+        if not _ready:
+            _build()
+        else:
+            _load_user(ticket.user_id)
+        _entries[qr_code] = _entry(ticket.id, qr_code, ticket.user_id, ticket.verified, ticket.verified_at)
+        _qr_by_user[ticket.user_id] = qr_code
+        return dict(_entries[qr_code])
+
+def add_ticket(ticket):
+    with _lock:
+        if not _ready:
+            return
+        if ticket.user_id not in _users:
+            _load_user(ticket.user_id)
+        _entries[ticket.qr_code] = _entry(ticket.id, ticket.qr_code, ticket.user_id, ticket.verified, ticket.verified_at)
+        _qr_by_user[ticket.user_id] = ticket.qr_code
+
+def mark_verified(qr_code, verified_at):
+    with _lock:
+        entry = _entries.get(qr_code)
+        if entry:
+            entry['verified'] = True
+            entry['verified_at'] = verified_at
+
+def refresh_user(user_id):
+    from app.services import ticket_sync
+    with _lock:
+        if _ready:
+            _load_user(user_id)
+            _recompute_user(user_id)
+        # other workers reload just this user; if Redis is unreachable fall back to a full rebuild
+        if not _publish_user(user_id):
+            _bump_generation()
+    ticket_sync.stamp_user(user_id)
+
+def refresh_pricing():
+    from app.services import ticket_sync
+    with _lock:
+        if _ready:
+            _load_pricing()
+            for user_id in list(_qr_by_user):
+                _recompute_user(user_id)
+        _bump_generation()
+    ticket_sync.stamp_all()
+
+def invalidate():
+    global _ready
+    with _lock:
+        _ready = False
+        _bump_generation()
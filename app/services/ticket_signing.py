@@ -0,0 +1,154 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from datetime import timezone
+from functools import lru_cache
+from flask import current_app
+from app import DEFAULT_SESSION_SECRET, db
+from app.services import cache
+
+# Self-verifying ticket codes: T1.<kid>.<claims>.<mac>. The claims carry the
+# ticket and holder plus the price, bar discount and invite count at issue
+# time, and the MAC is a truncated HMAC-SHA256 over everything before it, so
+# a scan can be checked and shown without reading the database. Keys come
+# from TICKET_SIGNING_KEYS ("kid:secret,kid:secret"): the first one signs,
+# all of them verify, so a new key can be rolled out before the old one is
+# dropped. Tickets issued before their holder was banned are revoked; the
+# ban times are kept in the cache and mirrored in process memory.
+
+PREFIX = 'T1.'
+MAC_BYTES = 12
+REVOKED_KEY = 'tickets:revoked'
+REVOKED_TTL = 86400
+# SESSION_SECRET values anyone can read in this repo; no key is derived from them
+PUBLIC_SECRETS = (DEFAULT_SESSION_SECRET, 'your-secret-key-here-change-in-production')
+SYNC_INTERVAL = float(os.getenv('TICKET_INDEX_SYNC_INTERVAL', 2))
+
+# verify() problems
+MALFORMED = 'malformed'
+UNKNOWN_KEY = 'unknown_key'
+FORGED = 'forged'
+REVOKED = 'revoked'
+
+_lock = threading.Lock()
+_revoked = None
+_synced_at = 0.0
+
+@lru_cache(maxsize=4)
+def _parse_keys(raw, fallback):
+    keys = []
+    for item in raw.split(','):
+        kid, _, secret = item.strip().partition(':')
+        if kid and secret and '.' not in kid:
+            keys.append((kid, secret.encode()))
+    if not keys and fallback not in PUBLIC_SECRETS:
+        # derived from SESSION_SECRET; set TICKET_SIGNING_KEYS to rotate keys on their own
+        keys.append(('0', hashlib.sha256(fallback.encode() + b':ticket-signing').digest()))
+    return tuple(keys)
+
+def _keys():
+    return _parse_keys(os.getenv('TICKET_SIGNING_KEYS', ''), str(current_app.secret_key))
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _mac(key, signed_part):
+    return _b64(hmac.new(key, signed_part.encode(), hashlib.sha256).digest()[:MAC_BYTES])
+
+def configured():
+    """False when the only key would come from a public default secret, which anyone could forge with"""
+    return bool(_keys())
+
+def enabled():
+    """EventConfig.ticket_qr_enabled picks signed codes for new tickets; legacy codes keep working"""
+    from app.models import EventConfig
+    if not configured():
+        return False
+    return db.session.query(EventConfig.ticket_qr_enabled).limit(1).scalar() is not False
+
+def is_signed(qr_code):
+    return qr_code.startswith(PREFIX)
+
+def sign(ticket_id, holder):
+    """Code for ticket_id; holder is ticket_index.holder() for the ticket's user"""
+    if not configured():
+        raise RuntimeError('Set TICKET_SIGNING_KEYS or SESSION_SECRET before signing ticket codes')
+    kid, key = _keys()[0]
+    claims = [
+        ticket_id, holder['user_id'], holder['username'], holder['role'],
+        round(holder['ticket_price'] * 100), round(holder['bar_discount'] * 100), holder['invites'],
+        int(time.time()),
+    ]
+    signed_part = f"{PREFIX}{kid}.{_b64(json.dumps(claims, separators=(',', ':')).encode())}"
+    return f'{signed_part}.{_mac(key, signed_part)}'
+
+def verify(qr_code):
+    """(entry, None) shaped like a ticket_index entry, or (None, problem)"""
+    try:
+        signed_part, mac = qr_code.rsplit('.', 1)
+        kid, body = signed_part[len(PREFIX):].split('.')
+    except ValueError:
+        return None, MALFORMED
+    key = dict(_keys()).get(kid)
+    if key is None:
+        return None, UNKNOWN_KEY
+    if not hmac.compare_digest(mac.encode(), _mac(key, signed_part).encode()):
+        return None, FORGED
+    try:
+        ticket_id, user_id, username, role, price_cents, discount_bp, invites, issued_at = json.loads(_unb64(body))
+    except (TypeError, ValueError):
+        return None, MALFORMED
+
+    banned_at = _revocations().get(str(user_id))
+    if banned_at is not None and issued_at < banned_at:
+        return None, REVOKED
+
+    return {
+        'ticket_id': ticket_id,
+        'qr_code': qr_code,
+        'user_id': user_id,
+        'username': username,
+        'role': role,
+        'invites': invites,
+        'bar_discount': discount_bp / 100,
+        'ticket_price': price_cents / 100,
+        'verified': False,
+        'verified_at': None,
+        'issued_at': issued_at,
+    }, None
+
+def _load_revocations():
+    from app.models import User
+    rows = db.session.query(User.id, User.banned_at).filter(User.banned_at.isnot(None))
+    # JSON object keys, so user ids are kept as strings
+    return {str(user_id): banned_at.replace(tzinfo=timezone.utc).timestamp() for user_id, banned_at in rows}
+
+def _revocations():
+    global _revoked, _synced_at
+    now = time.monotonic()
+    if _revoked is not None and now - _synced_at < SYNC_INTERVAL:
+        return _revoked
+    with _lock:
+        revoked = cache.get(REVOKED_KEY)
+        if revoked is None:
+            revoked = _load_revocations()
+            cache.set(REVOKED_KEY, revoked, ttl=REVOKED_TTL)
+        _revoked = revoked
+        _synced_at = now
+        return _revoked
+
+def refresh_revocations():
+    """Call after banning or unbanning someone"""
+    global _revoked, _synced_at
+    revoked = _load_revocations()
+    cache.set(REVOKED_KEY, revoked, ttl=REVOKED_TTL)
+    with _lock:
+        _revoked = revoked
+        _synced_at = time.monotonic()
@@ -0,0 +1,168 @@
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, bindparam, func, or_, select, text, update
+from app import db
+from app.models import EventConfig, Ticket
+from app.services import serializers, ticket_index
+
+# Change feed for door scanners. Each ticket carries a change_seq that is
+# restamped whenever something a scanner shows for it changes: creation,
+# verification, the holder's role, price or bar discount. Scanners pull the
+# rows past their cursor, answer scans locally and upload offline scans in
+# batches. On Postgres the stamps come from a sequence taken under a
+# transaction-level advisory lock, so they commit in order and a cursor can
+# never move past a row that is still in flight.
+
+SEQUENCE = 'ticket_change_seq'
+STAMP_LOCK = 0x7469636b
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+MAX_SCANS = 500
+# offline scans count from this long before the event starts, and are never older than MAX_SCAN_AGE
+SCANS_OPEN_BEFORE = timedelta(hours=float(os.getenv('SCANS_OPEN_BEFORE_HOURS', 6)))
+MAX_SCAN_AGE = timedelta(hours=float(os.getenv('OFFLINE_SCAN_MAX_AGE_HOURS', 24)))
+FIELDS = (
+    'seq', 'ticket_id', 'qr_code', 'user_id', 'username', 'role',
+    'ticket_price', 'bar_discount', 'invites', 'verified_at',
+)
+
+def _postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+def next_change():
+    """SQL value for Ticket.change_seq; take it as late as possible before committing"""
+    if _postgres():
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': STAMP_LOCK})
+        return func.nextval(SEQUENCE)
+    # SQLite has a single writer, so max + 1 cannot be handed out twice
+    latest = Ticket.__table__.alias('latest')
+    return select(func.coalesce(func.max(latest.c.change_seq), 0) + 1).scalar_subquery()
+
+def stamp(*criteria):
+    db.session.execute(
+        update(Ticket).where(*criteria).values(change_seq=next_change())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+def stamp_user(user_id):
+    stamp(Ticket.user_id == user_id)
+
+def stamp_all():
+    stamp()
+
+def changes(since, limit=DEFAULT_LIMIT):
+    """Tickets stamped after since, as rows of FIELDS, plus the cursor to send next time"""
+    base = db.session.query(Ticket.change_seq, Ticket.id, Ticket.qr_code, Ticket.verified, Ticket.verified_at)
+    rows = base.filter(Ticket.change_seq > since).order_by(Ticket.change_seq, Ticket.id).limit(limit).all()
+    more = len(rows) == limit
+    if more:
+        # a bulk stamp can share one value; send all of it so the cursor can move past
+        last = rows[-1]
+        rows += base.filter(Ticket.change_seq == last.change_seq, Ticket.id > last.id).order_by(Ticket.id).all()
+
+    entries = ticket_index.lookup_many([row.qr_code for row in rows])
+    tickets = []
+    for row in rows:
+        entry = entries.get(row.qr_code)
+        if not entry:
+            continue
+        tickets.append([
+            row.change_seq, row.id, row.qr_code, entry['user_id'], entry['username'], entry['role'],
+            entry['ticket_price'], entry['bar_discount'], entry['invites'],
+            serializers.iso(row.verified_at) if row.verified else None,
+        ])
+    return {
+        'cursor': rows[-1].change_seq if rows else since,
+        'more': more,
+        'fields': FIELDS,
+        'tickets': tickets,
+    }
+
+def _scans_open(now):
+    opens = now - MAX_SCAN_AGE
+    event_date = db.session.query(EventConfig.event_date).limit(1).scalar()
+    return max(opens, event_date - SCANS_OPEN_BEFORE) if event_date else opens
+
+def _scan_time(value, now, opens):
+    try:
+        scanned_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    if scanned_at.tzinfo is not None:
+        scanned_at = scanned_at.astimezone(timezone.utc).replace(tzinfo=None)
+    # a backdated scan would outrank the real first one and take its verifier
+    if scanned_at < opens:
+        return None
+    # a scanner clock running ahead must not outrank a real later scan
+    return min(scanned_at, now)
+
+def record_scans(scans, inspector_id):
+    """Apply a batch of offline scans; the earliest scan of a ticket wins over other offline scans"""
+    now = datetime.utcnow()
+    opens = _scans_open(now)
+    parsed = []
+    earliest = {}
+    for scan in scans:
+        qr_code = scan.get('qr_code') if isinstance(scan, dict) else None
+        if not isinstance(qr_code, str):
+            qr_code = None
+        scanned_at = _scan_time(scan.get('scanned_at'), now, opens) if qr_code else None
+        parsed.append((qr_code, scanned_at))
+        if scanned_at and (qr_code not in earliest or scanned_at < earliest[qr_code]):
+            earliest[qr_code] = scanned_at
+
+    ids = dict(db.session.query(Ticket.qr_code, Ticket.id).filter(Ticket.qr_code.in_(list(earliest)))) if earliest else {}
+    if ids:
+        tickets = Ticket.__table__
+        db.session.execute(
+            update(tickets)
+            .where(
+                tickets.c.id == bindparam('ticket_id'),
+                or_(
+                    tickets.c.verified.isnot(True),
+                    # an online verification is final; only an earlier offline one is replaced
+                    and_(tickets.c.verified_offline.is_(True), tickets.c.verified_at > bindparam('scanned_at'))
+                )
+            )
+            .values(
+                verified=True, verified_at=bindparam('scanned_at'), verified_by=bindparam('inspector_id'),
+                verified_offline=True, change_seq=next_change(), updated_at=now
+            ),
+            [
+                {'ticket_id': ticket_id, 'scanned_at': earliest[qr_code], 'inspector_id': inspector_id}
+                for qr_code, ticket_id in ids.items()
+            ]
+        )
+    current = {
+        row.qr_code: row
+        for row in db.session.query(Ticket.qr_code, Ticket.verified_at, Ticket.verified_by).filter(Ticket.id.in_(list(ids.values())))
+    } if ids else {}
+    db.session.commit()
+
+    won = {
+        qr_code for qr_code, row in current.items()
+        if row.verified_by == inspector_id and row.verified_at == earliest[qr_code]
+    }
+    for qr_code in won:
+        ticket_index.mark_verified(qr_code, earliest[qr_code])
+
+    results = []
+    claimed = set()
+    for qr_code, scanned_at in parsed:
+        if not scanned_at:
+            results.append({'qr_code': qr_code, 'status': 'rejected'})
+        elif qr_code not in current:
+            results.append({'qr_code': qr_code, 'status': 'invalid'})
+        else:
+            row = current[qr_code]
+            first = qr_code in won and qr_code not in claimed and scanned_at == earliest[qr_code]
+            if first:
+                claimed.add(qr_code)
+            results.append({
+                'qr_code': qr_code,
+                'status': 'verified' if first else 'already_verified',
+                'verified_at': serializers.iso(row.verified_at),
+                'verified_by': row.verified_by,
+            })
+    return results, bool(won)
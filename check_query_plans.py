@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql
+from app import create_app, db
+from app.models import User, Invitation, Ticket, BarItem, BarInventory, BarTransaction, BarPayout
+
+# EXPLAINs the hot lookups from the route modules against a seeded database and
+# fails when any of them sequentially scans a table above the row threshold.
+# Seed rows are inserted in one transaction that is rolled back at the end.
+
+SEQ_SCAN_ROW_THRESHOLD = int(os.getenv('SEQ_SCAN_ROW_THRESHOLD', 1000))
+SEED_ROWS = int(os.getenv('QUERY_PLAN_SEED_ROWS', 20000))
+
+def seed(rows):
+    tag = uuid.uuid4().hex[:8]
+    now = datetime.utcnow()
+    user_ids = db.session.execute(User.__table__.insert().returning(User.id), [{
+        'instagram_id': f'plancheck-{tag}-{i}',
+        'username': f'plancheck_{tag}_{i}',
+        'role': 'ticket-inspector' if i % 200 == 0 else 'user',
+        'is_admin': False,
+        'is_banned': False,
+        'created_at': now,
+    } for i in range(rows)]).scalars().all()
+    db.session.execute(Invitation.__table__.insert(), [{
+        'inviter_id': user_ids[i % len(user_ids)],
+        'invitee_instagram_id': f'plancheck-{tag}-invitee-{i}',
+        'invitee_username': f'plancheck_{tag}_invitee_{i}',
+        'status': 'accepted' if i % 3 == 0 else 'pending',
+        'created_at': now,
+    } for i in range(rows)])
+    db.session.execute(Ticket.__table__.insert(), [{
+        'user_id': user_id,
+        'qr_code': f'plancheck-{tag}-{user_id}',
+        'verified': i % 20 == 0,
+        'verified_by': user_ids[0] if i % 20 == 0 else None,
+        'status': 'active',
+        'created_at': now,
+    } for i, user_id in enumerate(user_ids)])
+    item_ids = db.session.execute(BarItem.__table__.insert().returning(BarItem.id), [{
+        'name': f'plancheck-{tag}-{i}', 'price': 5, 'available': True, 'created_at': now,
+    } for i in range(rows // 10)]).scalars().all()
+    db.session.execute(BarInventory.__table__.insert(), [{
+        'item_id': item_id, 'quantity': 100, 'last_updated': now,
+    } for item_id in item_ids])
+    bartenders = user_ids[:rows // 100]
+    db.session.execute(BarTransaction.__table__.insert(), [{
+        'bartender_id': bartenders[i % len(bartenders)],
+        'items_json': {str(item_ids[i % len(item_ids)]): 1},
+        'total_amount': 5, 'discount_applied': 0, 'actual_amount': 5,
+        'completed_at': now - timedelta(seconds=i),
+    } for i in range(rows)])
+    db.session.execute(BarPayout.__table__.insert(), [{
+        'bartender_id': bartenders[i % len(bartenders)], 'amount': 5, 'created_at': now,
+    } for i in range(rows // 4)])
+    return user_ids, item_ids, tag
+
+def hot_queries(user_ids, item_ids, tag):
+    user_id = user_ids[len(user_ids) // 2]
+    return [
+        ('auth.verify_otp: user by username', select(User).where(User.username == f'plancheck_{tag}_7')),
+        ('auth.verify_otp: invitation by invitee', select(Invitation).where(Invitation.invitee_username == f'plancheck_{tag}_invitee_7')),
+        ('tickets.calculate_ticket_price: accepted invites', select(func.count(Invitation.id)).where(
+            Invitation.inviter_id == user_id, Invitation.status == 'accepted')),
+        ('tickets.get_my_ticket: ticket by user', select(Ticket).where(Ticket.user_id == user_id)),
+        ('tickets.verify_ticket: ticket by qr code', select(Ticket).where(Ticket.qr_code == f'plancheck-{tag}-{user_id}')),
+        ('tickets: tickets verified by inspector', select(func.count(Ticket.id)).where(Ticket.verified_by == user_ids[1])),
+        ('invitations.get_my_invitations: by inviter', select(Invitation).where(Invitation.inviter_id == user_id)),
+        ('admin.inspector_payments: inspectors', select(User.id, User.username).where(User.role == 'ticket-inspector')),
+        ('bar.create_preset_discount: user by username', select(User).where(User.username == f'plancheck_{tag}_9')),
+        ('bar.update_inventory: inventory by item', select(BarInventory).where(BarInventory.item_id == item_ids[-1])),
+        ('bar.get_bartender_transactions: by bartender', select(BarTransaction).where(
+            BarTransaction.bartender_id == user_ids[0]).order_by(BarTransaction.completed_at.desc())),
+        ('bar_ledger.reconcile: payouts by bartender', select(func.sum(BarPayout.amount)).where(BarPayout.bartender_id == user_ids[0])),
+    ]
+
+def seq_scans(plan, row_counts):
+    if plan.get('Node Type') == 'Seq Scan':
+        relation = plan.get('Relation Name')
+        if row_counts.get(relation, 0) > SEQ_SCAN_ROW_THRESHOLD:
+            yield relation
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child, row_counts)
+
+app = create_app()
+
+with app.app_context():
+    if db.engine.dialect.name != 'postgresql':
+        print(f"✗ Query plan check needs PostgreSQL (got {db.engine.dialect.name})")
+        sys.exit(2)
+    
+    failures = 0
+    try:
+        user_ids, item_ids, tag = seed(SEED_ROWS)
+        tables = ['users', 'invitations', 'tickets', 'bar_items', 'bar_inventory', 'bar_transactions', 'bar_payouts']
+        for table in tables:
+            db.session.execute(db.text(f'ANALYZE {table}'))
+        row_counts = dict(db.session.execute(db.text(
+            'SELECT relname, reltuples FROM pg_class WHERE relname = ANY(:tables)'
+        ), {'tables': tables}).all())
+        
+        for name, stmt in hot_queries(user_ids, item_ids, tag):
+            sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+            plan = db.session.execute(db.text(f'EXPLAIN (FORMAT JSON) {sql}')).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scanned = sorted(set(seq_scans(plan[0]['Plan'], row_counts)))
+            if scanned:
+                failures += 1
+                print(f"✗ {name}: Seq Scan on {', '.join(scanned)}")
+            else:
+                print(f"✓ {name}")
+    finally:
+        db.session.rollback()
+
+if failures:
+    print(f"\n✗ {failures} hot quer{'y' if failures == 1 else 'ies'} fell back to a sequential scan above {SEQ_SCAN_ROW_THRESHOLD} rows")
+    sys.exit(1)
+
+print("\n✓ All hot queries use an index")
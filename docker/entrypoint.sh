@@ -12,7 +12,13 @@ export REDIS_HOST="${REDIS_HOST:-127.0.0.1}"
 export REDIS_PORT="${REDIS_PORT:-6379}"
 export HOST="${HOST:-0.0.0.0}"
 export PORT="${PORT:-5002}"
+export EVENTS_PORT="${EVENTS_PORT:-5003}"
+export EVENT_STREAM_THREADS="${EVENT_STREAM_THREADS:-100}"
 export APP_MODE="${APP_MODE:-dev}"
+case "$APP_MODE" in
+  prod|production) APP_MODE=production ;;
+  *) APP_MODE=dev ;;
+esac
 export CADDY_PORT="${CADDY_PORT:-5001}"
 export VITE_DEV_HOST="${VITE_DEV_HOST:-127.0.0.1}"
 export VITE_DEV_PORT="${VITE_DEV_PORT:-5173}"
@@ -43,22 +49,38 @@ fi
 echo "Running database migrations..."
 python run_all_migrations.py
 
-python app.py &
-backend_pid=$!
+pids=()
 
-npm run dev -- --host "$VITE_DEV_HOST" --port "$VITE_DEV_PORT" &
-frontend_pid=$!
+if [ "$APP_MODE" = "production" ]; then
+  echo "Starting gunicorn (production mode)..."
+  gunicorn --config gunicorn.conf.py wsgi:app &
+  pids+=($!)
+
+  # /api/events streams are long-lived and mostly idle; give them their own
+  # process so they never take threads from ordinary requests
+  PORT="$EVENTS_PORT" WEB_CONCURRENCY=1 GUNICORN_THREADS="$EVENT_STREAM_THREADS" \
+    EVENT_MAX_STREAMS="$EVENT_STREAM_THREADS" gunicorn --config gunicorn.conf.py wsgi:app &
+  pids+=($!)
+else
+  # the dev server handles streams itself
+  export EVENTS_PORT="$PORT"
+  python app.py &
+  pids+=($!)
+
+  npm run dev -- --host "$VITE_DEV_HOST" --port "$VITE_DEV_PORT" &
+  pids+=($!)
+fi
 
 caddy run --config /etc/caddy/Caddyfile --adapter caddyfile &
-caddy_pid=$!
+pids+=($!)
 
 cleanup() {
   set +e
-  kill "$backend_pid" "$frontend_pid" "$caddy_pid" 2>/dev/null || true
+  kill "${pids[@]}" 2>/dev/null || true
   redis-cli -p "$REDIS_PORT" shutdown >/dev/null 2>&1 || true
   su postgres -s /bin/bash -c "pg_ctl -D '$PGDATA' -m fast stop" >/dev/null 2>&1 || true
 }
 
 trap cleanup EXIT INT TERM
 
-wait -n "$backend_pid" "$frontend_pid" "$caddy_pid"
\ No newline at end of file
+wait -n "${pids[@]}"
\ No newline at end of file
@@ -0,0 +1,39 @@
+import multiprocessing
+import os
+
+# Production server settings, used by docker/entrypoint.sh when APP_MODE=production.
+# Reload gracefully with `kill -HUP <master pid>`.
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5002')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# import the app once in the master so workers fork with it already loaded
+preload_app = True
+
+# recycle workers now and then to cap slow leaks; jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+def post_fork(server, worker):
+    # connections opened by the master during create_app must not be shared across workers
+    from wsgi import app
+    from app import db
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # picks up broadcasts left behind by recycled or crashed workers
+    from app.services import broadcast
+    broadcast.watch(app)
+
+def worker_exit(server, worker):
+    # recycling kills the worker's job threads; stop them between batches instead
+    from app.services import jobs
+    jobs.stop_all()
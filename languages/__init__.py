@@ -1,3 +1,4 @@
+import hashlib
 import json
 import os
 from pathlib import Path
@@ -8,6 +9,7 @@ AVAILABLE_LANGUAGES = {
 }
 
 _translations = {}
+_files = None
 
 def load_language(lang_code='en'):
     if lang_code not in AVAILABLE_LANGUAGES:
@@ -41,3 +43,14 @@ def get_text(key, lang_code='en', **kwargs):
 
 def get_current_language():
     return os.getenv('APP_LANGUAGE', 'en')
+
+def language_files(reload=False):
+    """Raw bytes and ETag of every <code>.json here, read once per process"""
+    global _files
+    if _files is None or reload:
+        files = {}
+        for path in LANGUAGES_DIR.glob('*.json'):
+            raw = path.read_bytes()
+            files[path.stem] = (raw, hashlib.md5(raw).hexdigest()[:16])
+        _files = files
+    return _files
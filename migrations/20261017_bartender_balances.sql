@@ -0,0 +1,17 @@
+-- Running per-bartender ledger, kept current by every sale and payout
+CREATE TABLE IF NOT EXISTS bartender_balances (
+  bartender_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+  total_sales NUMERIC(12, 2) NOT NULL DEFAULT 0.00,
+  total_payouts NUMERIC(12, 2) NOT NULL DEFAULT 0.00,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Seed the ledger from existing history
+INSERT INTO bartender_balances (bartender_id, total_sales, total_payouts)
+SELECT u.id,
+  COALESCE((SELECT SUM(t.actual_amount) FROM bar_transactions t WHERE t.bartender_id = u.id), 0),
+  COALESCE((SELECT SUM(p.amount) FROM bar_payouts p WHERE p.bartender_id = u.id), 0)
+FROM users u
+WHERE EXISTS (SELECT 1 FROM bar_transactions t WHERE t.bartender_id = u.id)
+   OR EXISTS (SELECT 1 FROM bar_payouts p WHERE p.bartender_id = u.id)
+ON CONFLICT (bartender_id) DO NOTHING;
@@ -0,0 +1,5 @@
+-- Per-recipient broadcast tracking so jobs can report progress and resume
+ALTER TABLE bot_messages ADD COLUMN IF NOT EXISTS job_id VARCHAR(64);
+ALTER TABLE bot_messages ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS ix_bot_messages_job_id ON bot_messages(job_id);
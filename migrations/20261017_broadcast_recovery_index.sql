@@ -0,0 +1,4 @@
+-- migrate:no-transaction
+-- Each worker periodically looks for broadcasts that still have unsent
+-- recipients (broadcast.resume_abandoned); keep that off the full table.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bot_messages_unsent_job_id ON bot_messages(job_id) WHERE status IN ('pending', 'sending');
@@ -0,0 +1,12 @@
+-- migrate:no-transaction
+-- Indexes for the hot lookup predicates. CONCURRENTLY cannot run inside a
+-- transaction, so the runner executes this file statement by statement.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_username ON users(username);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_role ON users(role);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_invitations_invitee_username ON invitations(invitee_username);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_invitations_inviter_id_status ON invitations(inviter_id, status);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tickets_user_id ON tickets(user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tickets_verified_by ON tickets(verified_by);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bar_transactions_bartender_id_completed_at ON bar_transactions(bartender_id, completed_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bar_payouts_bartender_id ON bar_payouts(bartender_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bar_inventory_item_id ON bar_inventory(item_id);
@@ -0,0 +1,16 @@
+-- Keyset pages compare (created_at, id) / (completed_at, id) row by row, which
+-- NULL breaks. Rows without a timestamp get the epoch, where they already
+-- sorted, and the columns stop accepting NULL so the comparison can use the
+-- plain column and its index.
+UPDATE users SET created_at = '1970-01-01' WHERE created_at IS NULL;
+UPDATE invitations SET created_at = '1970-01-01' WHERE created_at IS NULL;
+UPDATE tickets SET created_at = '1970-01-01' WHERE created_at IS NULL;
+UPDATE manager_calls SET created_at = '1970-01-01' WHERE created_at IS NULL;
+UPDATE security_jobs SET created_at = '1970-01-01' WHERE created_at IS NULL;
+UPDATE bar_transactions SET completed_at = '1970-01-01' WHERE completed_at IS NULL;
+ALTER TABLE users ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE invitations ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE tickets ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE manager_calls ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE security_jobs ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE bar_transactions ALTER COLUMN completed_at SET NOT NULL;
@@ -0,0 +1,9 @@
+-- migrate:no-transaction
+-- Keyset pagination orders by (sort column, id) and seeks past the cursor, so
+-- each page reads limit + 1 index entries instead of scanning and sorting the table.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_created_at_id ON users(created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_invitations_created_at_id ON invitations(created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tickets_created_at_id ON tickets(created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_manager_calls_created_at_id ON manager_calls(created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_security_jobs_created_at_id ON security_jobs(created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bar_transactions_completed_at_id ON bar_transactions(completed_at, id);
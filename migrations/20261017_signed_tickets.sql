@@ -0,0 +1,3 @@
+-- Ban time, so signed tickets issued before a ban can be revoked
+ALTER TABLE users ADD COLUMN IF NOT EXISTS banned_at TIMESTAMP;
+UPDATE users SET banned_at = COALESCE(updated_at, NOW()) WHERE is_banned = TRUE AND banned_at IS NULL;
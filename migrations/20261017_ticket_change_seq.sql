@@ -0,0 +1,6 @@
+-- Change sequence for the scanner sync feed (GET /api/tickets/sync)
+CREATE SEQUENCE IF NOT EXISTS ticket_change_seq;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS change_seq BIGINT;
+UPDATE tickets SET change_seq = nextval('ticket_change_seq') WHERE change_seq IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_tickets_change_seq ON tickets(change_seq);
@@ -0,0 +1,3 @@
+-- Offline scan uploads may move an earlier offline verification, never one
+-- made online; existing verifications count as online
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS verified_offline BOOLEAN DEFAULT FALSE;
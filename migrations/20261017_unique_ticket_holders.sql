@@ -0,0 +1,13 @@
+-- One ticket per user, so concurrent generation (and the bulk job) can rely on
+-- ON CONFLICT. Earlier races could leave duplicates: keep the verified one,
+-- else the oldest.
+DELETE FROM tickets t
+USING tickets k
+WHERE t.user_id = k.user_id
+  AND (
+    (COALESCE(k.verified, FALSE) AND NOT COALESCE(t.verified, FALSE))
+    OR (COALESCE(k.verified, FALSE) = COALESCE(t.verified, FALSE) AND k.id < t.id)
+  );
+
+DROP INDEX IF EXISTS ix_tickets_user_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_tickets_user_id ON tickets(user_id);
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+import sys
+from app import create_app
+from app.services import bar_ledger
+
+fix = '--fix' in sys.argv[1:]
+app = create_app()
+
+with app.app_context():
+    drift = bar_ledger.reconcile(fix=fix)
+
+if not drift:
+    print("✓ Bartender ledger matches transaction and payout history")
+    sys.exit(0)
+
+for row in drift:
+    print(
+        f"✗ bartender {row['bartender_id']}: "
+        f"sales {row['recorded_sales']:.2f} (expected {row['expected_sales']:.2f}), "
+        f"payouts {row['recorded_payouts']:.2f} (expected {row['expected_payouts']:.2f})"
+    )
+
+if fix:
+    print(f"\n✓ Rebuilt {len(drift)} ledger row(s) from history")
+else:
+    print(f"\n{len(drift)} ledger row(s) drifted; rerun with --fix to rebuild them")
+    sys.exit(1)
@@ -1,29 +1,23 @@
 #!/usr/bin/env python
-import os
 import sys
-from pathlib import Path
-from app import create_app, db
+from app import create_app
+from app.services import schema_migrations
 
-app = create_app()
+# Usage: run_all_migrations.py [--plan|--dry-run]
+dry_run = bool({'--plan', '--dry-run'} & set(sys.argv[1:]))
 
-migrations_dir = Path('migrations')
-migration_files = sorted(migrations_dir.glob('*.sql'))
+app = create_app()
 
 with app.app_context():
-    for migration_file in migration_files:
-        try:
-            with open(migration_file, 'r') as f:
-                sql = f.read()
-            
-            statements = [s.strip() for s in sql.split(';') if s.strip()]
-            for statement in statements:
-                db.session.execute(db.text(statement))
-            
-            db.session.commit()
-            print(f"✓ {migration_file.name}")
-        except Exception as e:
-            db.session.rollback()
-            print(f"✗ {migration_file.name}: {e}")
-            sys.exit(1)
+    try:
+        names = schema_migrations.migrate(dry_run=dry_run, log=lambda line: print(f"✓ {line}"))
+    except Exception as e:
+        print(f"✗ {e}")
+        sys.exit(1)
 
-print("\n✓ All migrations executed successfully")
+if dry_run:
+    print(f"\n{len(names)} migration(s) pending")
+elif names:
+    print(f"\n✓ Applied {len(names)} migration(s)")
+else:
+    print("\n✓ Schema is up to date")
@@ -1,6 +1,6 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
-import { adminService } from '../services/api';
+import { adminService, subscribeEvents } from '../services/api';
 import './AdminPanel.css';
 
 export default function AdminPanel() {
@@ -13,6 +13,7 @@ export default function AdminPanel() {
   const [salaries, setSalaries] = useState([]);
   const [inspectorPayments, setInspectorPayments] = useState([]);
   const [broadcastMessage, setBroadcastMessage] = useState('');
+  const [ticketJob, setTicketJob] = useState(null);
   const [managerCalls, setManagerCalls] = useState([]);
   const [securityJobs, setSecurityJobs] = useState([]);
   const [newJobTitle, setNewJobTitle] = useState('');
@@ -34,6 +35,7 @@ export default function AdminPanel() {
   const [loading, setLoading] = useState(false);
   const [success, setSuccess] = useState('');
   const [error, setError] = useState('');
+  const dashboardVersion = useRef(null);
 
   // allow any user whose account has the admin flag; the role string is
   // still kept around for backwards compatibility, but the boolean comes
@@ -51,39 +53,46 @@ export default function AdminPanel() {
   useEffect(() => {
     loadData();
     setCurrency(import.meta.env.VITE_CURRENCY || 'HUF');
-    const interval = setInterval(loadData, 3000);
+    // manager calls and security jobs arrive over the event stream; the poll covers the rest
+    const interval = setInterval(loadData, 10000);
     return () => clearInterval(interval);
   }, []);
 
+  useEffect(() => {
+    const upsert = (setter) => ({ type, data }) => setter((current) => {
+      if (type === 'deleted') return current.filter(row => row.id !== data.id);
+      return current.some(row => row.id === data.id)
+        ? current.map(row => row.id === data.id ? data : row)
+        : [data, ...current];
+    });
+    return subscribeEvents(['security', 'manager_calls'], {
+      reset: loadData,
+      security: upsert(setSecurityJobs),
+      manager_calls: upsert(setManagerCalls)
+    });
+  }, []);
+
   const loadData = async () => {
     try {
-      const [usersRes, invitationsRes, configRes, salariesRes, paymentsRes, callsRes, jobsRes, itemsRes, inviteDiscsRes, presetDiscsRes, inventoryRes, balancesRes] = await Promise.all([
-        adminService.getUsers(),
-        adminService.getInvitations(),
-        adminService.getConfig(),
-        adminService.getSalaries(),
-        fetch('/api/admin/inspector-payments', { credentials: 'include' }).then(r => r.json()),
-        fetch('/api/admin/manager-calls', { credentials: 'include' }).then(r => r.json()),
-        fetch('/api/admin/security-jobs', { credentials: 'include' }).then(r => r.json()),
-        fetch('/api/admin/bar-items', { credentials: 'include' }).then(r => r.json().catch(() => [])),
-        fetch('/api/admin/invite-discounts', { credentials: 'include' }).then(r => r.json().catch(() => [])),
-        fetch('/api/admin/preset-discounts', { credentials: 'include' }).then(r => r.json().catch(() => [])),
-        fetch('/api/admin/inventory', { credentials: 'include' }).then(r => r.json().catch(() => [])),
-        fetch('/api/admin/bartender-balances', { credentials: 'include' }).then(r => r.json().catch(() => []))
-      ]);
-      
-      setUsers(usersRes.data);
-      setInvitations(invitationsRes.data);
-      setConfig(configRes.data);
-      setSalaries(salariesRes.data);
-      setInspectorPayments(paymentsRes);
-      setManagerCalls(callsRes);
-      setSecurityJobs(jobsRes);
-      setBarItems(itemsRes);
-      setInviteDiscounts(inviteDiscsRes);
-      setPresetDiscounts(presetDiscsRes);
-      setInventory(inventoryRes);
-      setBartenderBalances(balancesRes);
+      const since = dashboardVersion.current ? `?since=${encodeURIComponent(dashboardVersion.current)}` : '';
+      const { data } = await adminService.getDashboard(since);
+      const sections = data.sections || {};
+      const setters = {
+        users: setUsers,
+        invitations: setInvitations,
+        config: setConfig,
+        salaries: setSalaries,
+        inspector_payments: setInspectorPayments,
+        manager_calls: setManagerCalls,
+        security_jobs: setSecurityJobs,
+        bar_items: setBarItems,
+        invite_discounts: setInviteDiscounts,
+        preset_discounts: setPresetDiscounts,
+        inventory: setInventory,
+        bartender_balances: setBartenderBalances
+      };
+      Object.entries(sections).forEach(([name, value]) => setters[name]?.(value));
+      dashboardVersion.current = data.version;
     } catch (err) {
       setError('Failed to load data');
       console.error(err);
@@ -149,7 +158,7 @@ export default function AdminPanel() {
 
     try {
       await adminService.broadcast({ content: broadcastMessage });
-      setSuccess('Broadcast sent successfully!');
+      setSuccess('Broadcast queued, messages are being sent');
       setBroadcastMessage('');
     } catch (err) {
       setError('Failed to send broadcast');
@@ -158,6 +167,37 @@ export default function AdminPanel() {
     }
   };
 
+  const generateAllTickets = async () => {
+    setError('');
+    setSuccess('');
+    try {
+      const response = await adminService.generateAllTickets();
+      const jobId = response.data.job_id;
+      setTicketJob({ state: 'queued' });
+      const poll = async () => {
+        let status;
+        try {
+          status = (await adminService.getGenerateAllTickets(jobId)).data;
+        } catch (err) {
+          setTicketJob(null);
+          setError('Lost track of ticket generation');
+          return;
+        }
+        setTicketJob(status);
+        if (status.state === 'queued' || status.state === 'running') {
+          setTimeout(poll, 1000);
+        } else if (status.state === 'finished') {
+          setSuccess(`Generated ${status.result.created} tickets`);
+        } else {
+          setError('Ticket generation failed');
+        }
+      };
+      poll();
+    } catch (err) {
+      setError(err.response?.status === 409 ? 'Ticket generation is already running' : 'Failed to start ticket generation');
+    }
+  };
+
   const updateSalary = async (role, salary) => {
     setLoading(true);
     setError('');
@@ -580,6 +620,16 @@ export default function AdminPanel() {
                 </label>
                 <p className="help-text">Allow users to generate QR codes for ticket verification</p>
               </div>
+              <div className="form-group">
+                <button
+                  onClick={generateAllTickets}
+                  disabled={ticketJob?.state === 'queued' || ticketJob?.state === 'running'}
+                  className="submit-btn"
+                >
+                  {ticketJob?.state === 'running' ? `GENERATING ${ticketJob.done || 0}/${ticketJob.total || 0}` : 'GENERATE ALL TICKETS'}
+                </button>
+                <p className="help-text">Create tickets now for everyone who can attend, instead of when they first open the app</p>
+              </div>
             </fieldset>
 
             <button onClick={updateConfig} disabled={loading} className="submit-btn">
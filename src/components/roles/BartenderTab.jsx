@@ -272,12 +272,13 @@ export default function BartenderTab({ user, onCallManager }) {
       });
 
       if (response.ok) {
+        const { stock = {} } = await response.json();
         const totalMoney = subtotal - discount;
         setSuccess(`✓ Sale completed! Bartender should have: ${totalMoney.toFixed(2)} ${currency}`);
         setCart([]);
         setCustomerData(null);
         setShowCheckoutConfirm(false);
-        await loadInventory();
+        setInventory(prev => ({ ...prev, ...stock }));
         setTimeout(() => setSuccess(''), 5000);
       } else {
         setError('✗ Failed to complete sale');
@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react';
+import { subscribeEvents } from '../../services/api';
 
 export default function SecurityTab({ user, onCallManager }) {
   const [incidents, setIncidents] = useState([]);
@@ -12,9 +13,17 @@ export default function SecurityTab({ user, onCallManager }) {
   const [success, setSuccess] = useState('');
 
   useEffect(() => {
-    loadIncidents();
-    const interval = setInterval(loadIncidents, 5000);
-    return () => clearInterval(interval);
+    return subscribeEvents(['security'], {
+      open: loadIncidents,
+      reset: loadIncidents,
+      security: ({ type, data }) => setIncidents((current) => {
+        const rest = current.filter(i => i.id !== data.id);
+        if (type === 'deleted' || data.status !== 'open') return rest;
+        return current.some(i => i.id === data.id)
+          ? current.map(i => i.id === data.id ? data : i)
+          : [data, ...rest].slice(0, 50);
+      })
+    });
   }, []);
 
   const loadIncidents = async () => {
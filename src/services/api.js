@@ -45,9 +45,12 @@ export const ticketService = {
 };
 
 export const adminService = {
+  getDashboard: (since = '') => api.get(`/api/admin/dashboard${since}`),
   getUsers: () => api.get('/api/admin/users'),
   getInvitations: () => api.get('/api/admin/invitations'),
   getTickets: () => api.get('/api/admin/tickets'),
+  generateAllTickets: () => api.post('/api/admin/tickets/generate-all'),
+  getGenerateAllTickets: (jobId) => api.get(`/api/admin/tickets/generate-all/${jobId}`),
   getConfig: () => api.get('/api/admin/config'),
   updateConfig: (data) => api.put('/api/admin/config', data),
   updateUserRole: (userId, role) => api.put(`/api/admin/users/${userId}/role`, { role }),
@@ -62,4 +65,23 @@ export const languageService = {
   setLanguage: (code) => api.post(`/api/language/set/${code}`)
 };
 
+// Server-sent events for staff screens. `handlers` maps channel names to
+// callbacks taking { type, data }; `reset` fires when the server can no longer
+// replay what was missed and the caller should reload, `open` on the first
+// connection. The browser reconnects with Last-Event-ID by itself.
+export const subscribeEvents = (channels, handlers) => {
+  const source = new EventSource(
+    `${import.meta.env.VITE_API_URL || ''}/api/events/stream?channels=${channels.join(',')}`,
+    { withCredentials: true }
+  );
+  Object.entries(handlers).forEach(([name, handler]) => {
+    if (name === 'open') {
+      source.addEventListener('open', () => handler(), { once: true });
+    } else {
+      source.addEventListener(name, (e) => handler(JSON.parse(e.data)));
+    }
+  });
+  return () => source.close();
+};
+
 export default api;
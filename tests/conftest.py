@@ -0,0 +1,74 @@
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from app import create_app, db
+
+# `import app` loads .env with override=True, so point the app at a throwaway
+# SQLite file, session directory and an unreachable Redis only after that import
+def _configure(path):
+    os.environ['DATABASE_URL'] = f'sqlite:///{path / "test.db"}'
+    os.environ['SESSION_FILE_DIR'] = str(path / 'sessions')
+    os.environ['SCHEMA_CHECK'] = 'create_all'
+    os.environ['REDIS_PORT'] = '1'
+    os.environ.pop('REDIS_HOST', None)
+    os.environ['QUERY_AUDIT'] = 'true'
+    # ticket signing refuses the public default secret; keep the signed path covered
+    os.environ['SESSION_SECRET'] = 'test-session-secret'
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    _configure(tmp_path_factory.mktemp('app'))
+    app = create_app()
+    app.testing = True
+    with app.app_context():
+        db.create_all()
+        _seed()
+    yield app
+
+def _seed():
+    from app.models import (
+        User, EventConfig, Ticket, BarItem, BarInventory, SecurityIncident, SecurityJob, ManagerCall,
+        Invitation, InviteDiscount, PresetDiscount,
+    )
+    now = datetime.utcnow()
+    db.session.add(EventConfig(
+        event_date=now + timedelta(days=7), max_participants=100, member_count_release_date=now,
+        ticket_price=Decimal('100'), max_discount_percent=Decimal('50'), max_invites_per_user=3,
+    ))
+    users = {
+        role: User(instagram_id=role, username=role, role=role, is_admin=role == 'admin')
+        for role in ('admin', 'ticket-inspector', 'security', 'bartender', 'user', 'guest')
+    }
+    users['guest'].role = 'user'
+    db.session.add_all(users.values())
+    db.session.flush()
+    db.session.add_all([
+        Ticket(user_id=users['user'].id, qr_code='ticket-user'),
+        Invitation(inviter_id=users['user'].id, invitee_instagram_id='friend', invitee_username='friend', status='accepted'),
+        InviteDiscount(invite_count=1, discount_percent=Decimal('10')),
+        PresetDiscount(user_id=users['bartender'].id, discount_percent=Decimal('20')),
+        SecurityIncident(reported_by=users['security'].id, incident_type='noise'),
+        SecurityJob(title='Door'),
+        ManagerCall(user_id=users['user'].id),
+    ])
+    item = BarItem(name='Cola', price=Decimal('2.50'), category='Drink', available=True)
+    db.session.add(item)
+    db.session.flush()
+    db.session.add(BarInventory(item_id=item.id, quantity=100))
+    db.session.commit()
+
+@pytest.fixture(scope='session')
+def user_ids(app):
+    from app.models import User
+    with app.app_context():
+        return dict(db.session.query(User.username, User.id))
+
+@pytest.fixture
+def login(app, user_ids):
+    def login(username):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_ids[username]
+        return client
+    return login
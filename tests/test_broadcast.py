@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app import db
+from app.models import BotMessage
+from app.services import broadcast, jobs
+from app.services.broadcast import BroadcastEngine
+from app.services.instagram_bot import InstagramBot
+
+RATE = 20
+
+class StandIn:
+    """Local stand-in for the Instagram messages API.
+
+    script maps a username to the status codes it answers with, in order; the
+    last one repeats. Everyone else gets 200.
+    """
+
+    def __init__(self, script):
+        self.script = script
+        self.requests = []
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                username = body['recipient']['username']
+                with stand_in._lock:
+                    attempt = sum(1 for name, _ in stand_in.requests if name == username)
+                    stand_in.requests.append((username, time.monotonic()))
+                codes = stand_in.script.get(username, [200])
+                self.send_response(codes[min(attempt, len(codes) - 1)])
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def attempts(self, username):
+        return sum(1 for name, _ in self.requests if name == username)
+
+@pytest.fixture
+def serve(monkeypatch):
+    monkeypatch.setenv('INSTAGRAM_ACCESS_TOKEN', 'test-token')
+    servers = []
+
+    def serve(script):
+        server = StandIn(script)
+        threading.Thread(target=server.server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield serve
+    for server in servers:
+        server.server.shutdown()
+
+def _engine(stand_in):
+    return BroadcastEngine(bot=InstagramBot(api_url=stand_in.url), workers=4, rate=RATE, max_retries=2, backoff=0.01)
+
+def _statuses(job_id):
+    return dict(
+        db.session.query(BotMessage.sent_to_user_id, BotMessage.status).filter(BotMessage.job_id == job_id)
+    )
+
+def test_delivery_retry_and_rate(app, serve, user_ids):
+    stand_in = serve({'user': [503, 200], 'guest': [400], 'bartender': [429]})
+    with app.app_context():
+        engine = _engine(stand_in)
+        job_id = engine.create_job('Doors open at 8')
+        counts = engine.run(job_id)
+        statuses = _statuses(job_id)
+
+    assert counts == {'sent': 4, 'failed': 2}
+    # a 5xx is retried until it goes through
+    assert statuses[user_ids['user']] == 'sent'
+    assert stand_in.attempts('user') == 2
+    # other 4xx fail at once; 429 is retried up to max_retries
+    assert statuses[user_ids['guest']] == 'failed'
+    assert stand_in.attempts('guest') == 1
+    assert statuses[user_ids['bartender']] == 'failed'
+    assert stand_in.attempts('bartender') == 3
+    assert stand_in.attempts('admin') == 1
+
+    # every attempt, retries included, goes through the shared token bucket
+    times = sorted(at for _, at in stand_in.requests)
+    assert len(times) == 9
+    assert times[-1] - times[0] >= (len(times) - 1) / RATE * 0.9
+
+def test_abandoned_broadcast_is_resumed(app, serve, user_ids):
+    stand_in = serve({})
+    with app.app_context():
+        engine = _engine(stand_in)
+        job_id = engine.create_job('Moved to the back room')
+        # a recycled worker stopped here: one recipient claimed, the rest untouched
+        db.session.query(BotMessage).filter(
+            BotMessage.job_id == job_id, BotMessage.sent_to_user_id == user_ids['admin']
+        ).update({'status': 'sending'})
+        db.session.commit()
+        jobs.update(job_id, kind='broadcast', state='interrupted')
+
+        assert broadcast.resume_abandoned(bot=engine.bot) == [job_id]
+        deadline = time.monotonic() + 10
+        while jobs.get(job_id)['state'] != 'finished' and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # a finished job is not abandoned
+        assert broadcast.resume_abandoned(bot=engine.bot) == []
+        statuses = _statuses(job_id)
+
+    assert jobs.get(job_id)['state'] == 'finished'
+    assert set(statuses.values()) == {'sent'}
+    assert stand_in.attempts('admin') == 1
+
+def test_recycled_worker_stops_between_batches(app, serve, monkeypatch):
+    stand_in = serve({})
+    monkeypatch.setattr(broadcast, 'STATUS_FLUSH_SIZE', 1)
+    with app.app_context():
+        engine = BroadcastEngine(bot=InstagramBot(api_url=stand_in.url), workers=1, rate=5)
+        job_id = engine.start(engine.create_job('Last call'))
+        while not stand_in.requests:
+            time.sleep(0.01)
+        # what gunicorn's worker_exit hook does
+        jobs.stop_all(timeout=5)
+        statuses = _statuses(job_id)
+
+    assert jobs.get(job_id)['state'] == 'interrupted'
+    assert jobs.abandoned(job_id)
+    assert 'sending' not in statuses.values()
+    assert 0 < list(statuses.values()).count('sent') < len(statuses)
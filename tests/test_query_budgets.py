@@ -0,0 +1,79 @@
+import logging
+import pytest
+from app import db
+from app.services.query_audit import QueryBudgetExceeded, query_budget
+
+# Every view with a @query_budget runs here with testing on, where going over
+# budget raises. Each case runs twice: once with cold caches, once warm.
+BUDGETED = [
+    ('tickets.get_my_ticket', 'GET', '/api/tickets/', 'user', None),
+    ('tickets.generate_ticket', 'POST', '/api/tickets/generate', 'guest', None),
+    ('tickets.verify_ticket', 'POST', '/api/tickets/verify', 'ticket-inspector', {'qr_code': 'ticket-user'}),
+    ('tickets.sync_tickets', 'GET', '/api/tickets/sync', 'ticket-inspector', None),
+    ('tickets.upload_scans', 'POST', '/api/tickets/sync', 'ticket-inspector',
+     {'scans': [{'qr_code': 'ticket-user', 'scanned_at': '2026-01-01T20:00:00Z'}]}),
+    ('tickets.get_all_tickets', 'GET', '/api/tickets/all?limit=10', 'admin', None),
+    ('admin.get_manager_calls', 'GET', '/api/admin/manager-calls?limit=10', 'admin', None),
+    ('admin.get_security_jobs', 'GET', '/api/admin/security-jobs?limit=10', 'admin', None),
+    ('admin.get_dashboard', 'GET', '/api/admin/dashboard', 'admin', None),
+    ('event_info.get_event_info', 'GET', '/api/event/info', None, None),
+    ('security.get_incidents', 'GET', '/api/security/incidents', 'security', None),
+    ('bar.get_items', 'GET', '/api/bar/items', 'bartender', None),
+    ('bar.get_discounts', 'GET', '/api/bar/discounts', 'bartender', None),
+    ('bar.get_inventory', 'GET', '/api/bar/inventory', 'bartender', None),
+    ('bar.create_transaction', 'POST', '/api/bar/transactions', 'bartender', None),
+    ('admin_bar.get_preset_discounts', 'GET', '/api/admin/preset-discounts', 'admin', None),
+    ('admin_bar.get_all_inventory', 'GET', '/api/admin/inventory', 'admin', None),
+    ('admin_bar.get_all_transactions', 'GET', '/api/admin/transactions?limit=10', 'admin', None),
+    ('admin_bar.get_bartender_transactions', 'GET', '/api/admin/transactions/bartender/{bartender}', 'admin', None),
+]
+
+def _transaction(app, user_ids):
+    from app.models import BarItem
+    with app.app_context():
+        item_id = db.session.query(BarItem.id).scalar()
+    return {
+        'bartender_id': user_ids['bartender'], 'customer_id': user_ids['user'],
+        'items_json': {str(item_id): 1}, 'total_amount': 2.5, 'actual_amount': 2.5,
+    }
+
+def test_every_budgeted_view_is_covered(app):
+    budgeted = {name for name, view in app.view_functions.items() if hasattr(view, 'query_budget')}
+    assert budgeted == {case[0] for case in BUDGETED}
+
+@pytest.mark.parametrize('endpoint,method,path,username,body', BUDGETED, ids=[case[0] for case in BUDGETED])
+def test_view_stays_within_budget(app, login, user_ids, endpoint, method, path, username, body):
+    client = login(username) if username else app.test_client()
+    path = path.format(bartender=user_ids['bartender'])
+    if endpoint == 'bar.create_transaction':
+        body = _transaction(app, user_ids)
+    for _ in range(2):
+        response = client.open(path, method=method, json=body)
+        assert response.status_code < 400, response.get_data(as_text=True)
+        assert int(response.headers['X-Query-Count']) <= app.view_functions[endpoint].query_budget
+
+def _count_users():
+    from app.models import User
+    db.session.query(User.id).first()
+    db.session.query(User.id).first()
+    return 'ok'
+
+def test_over_budget_raises_in_testing(app):
+    with app.test_request_context():
+        from flask import g
+        g.sql_queries = 0
+        with pytest.raises(QueryBudgetExceeded, match='ran 2 queries'):
+            query_budget(1)(_count_users)()
+
+def test_over_budget_only_warns_when_not_strict(app, caplog):
+    app.testing = False
+    try:
+        with app.test_request_context(), caplog.at_level(logging.WARNING):
+            assert query_budget(1)(_count_users)() == 'ok'
+        assert 'Query budget exceeded' in caplog.text
+    finally:
+        app.testing = True
+
+def test_within_budget_passes(app):
+    with app.test_request_context():
+        assert query_budget(2)(_count_users)() == 'ok'
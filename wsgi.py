@@ -0,0 +1,10 @@
+import logging
+from app import create_app
+
+# Entry point for gunicorn (see gunicorn.conf.py); app.py stays the dev server
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+app = create_app()